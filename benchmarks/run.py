@@ -0,0 +1,235 @@
+"""Benchmarks reproducibles de AVLTree y del tick del juego.
+
+Uso (desde la raíz del repositorio, sin red ni pantalla):
+
+    python -m benchmarks.run                               # tamaños 1e3, 1e4, 1e5
+    python -m benchmarks.run --sizes 1000 1000000 --output bench.json
+    python -m benchmarks.run --baseline bench.json --tolerance 0.25
+
+La salida es JSON: cada medición es la mediana de --repeat muestras, y cada muestra repite la
+operación hasta sumar al menos --min-time segundos. Con --baseline se compara cada medición
+contra un JSON guardado y el proceso termina con código 1 si alguna es más lenta que
+baseline * (1 + tolerance) y además por más de --noise-floor segundos.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from gui.avl_tree import AVLTree
+from gui.json_loader import load_game_from_json
+from gui.persistent_avl import PersistentAVLTree
+from gui.simulation import GameSimulation, ACTION_UP, ACTION_DOWN, ACTION_JUMP
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+LANES = 4
+# Separación media entre obstáculos consecutivos en X
+SPACING = 40
+# Tiempo mínimo acumulado por muestra, como timeit.Timer.autorange: las operaciones cortas se
+# repiten hasta que la resolución del reloj y los picos sueltos dejan de pesar
+MIN_SAMPLE_SECONDS = 0.2
+# Diferencia absoluta (segundos) por debajo de la cual una medición más lenta se considera ruido
+NOISE_FLOOR = 1e-5
+
+
+def synthetic_obstacles(n, seed=0):
+    """Obstáculos en el esquema de level1.json, ordenados por x_world y sin claves repetidas."""
+    rnd = random.Random(seed)
+    obstacles = []
+    x = 500
+    for i in range(n):
+        x += rnd.randint(1, 2 * SPACING)
+        obstacles.append({
+            "id": i + 1,
+            "name": "Cono",
+            "color": "#E67E22",
+            "text_color": "#FFFFFF",
+            "x_world": x,
+            "lane_idx": rnd.randrange(LANES),
+            "width": 32,
+            "height": 32,
+        })
+    return obstacles
+
+
+def _timed(fn, repeat, min_time=MIN_SAMPLE_SECONDS, self_timed=False):
+    """Segundos por llamada a fn(): mediana de repeat muestras, cada una con tantas llamadas
+    como hagan falta para acumular min_time. fn recibe el número de llamada; con self_timed
+    devuelve el tiempo de la parte medida, porque antes prepara datos que no deben contarse.
+    Como timeit, mide con el recolector de basura desactivado."""
+    samples = []
+    calls = 0
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            total, count = 0.0, 0
+            while count == 0 or total < min_time:
+                t0 = time.perf_counter()
+                measured = fn(calls)
+                total += measured if self_timed else time.perf_counter() - t0
+                count += 1
+                calls += 1
+            samples.append(total / count)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return statistics.median(samples)
+
+
+def bench_tree(n, repeat, seed, min_time=MIN_SAMPLE_SECONDS):
+    results = {}
+    obstacles = synthetic_obstacles(n, seed)
+    items = [((o["x_world"], o["lane_idx"]), o) for o in obstacles]
+    shuffled = items[:]
+    random.Random(seed).shuffle(shuffled)
+
+    def insert(_r):
+        tree = AVLTree()
+        for key, ob in shuffled:
+            tree.insert(key, ob)
+    results["insert"] = _timed(insert, repeat, min_time)
+
+    def build(_r):
+        AVLTree.from_items(shuffled)
+    results["from_items"] = _timed(build, repeat, min_time)
+
+    def delete(_r):
+        tree = AVLTree.from_sorted(items)
+        t0 = time.perf_counter()
+        for key, _ob in shuffled:
+            tree.delete(key)
+        return time.perf_counter() - t0
+    results["delete"] = _timed(delete, repeat, min_time, self_timed=True)
+
+    tree = AVLTree.from_sorted(items)
+    for name in ("inorder", "preorder", "postorder", "bfs"):
+        traverse = getattr(tree, name)
+        results[name] = _timed(lambda _r: traverse(), repeat, min_time)
+
+    def evict(_r):
+        # Avanza el umbral 300 px por llamada (unos 50 ticks a speed=6) hasta vaciar el árbol
+        tree = AVLTree.from_sorted(items)
+        end = obstacles[-1]["x_world"] + 200
+        t0 = time.perf_counter()
+        for offset in range(0, end, 300):
+            tree.remove_passed_obstacles(offset)
+        return time.perf_counter() - t0
+    results["remove_passed_obstacles"] = _timed(evict, repeat, min_time, self_timed=True)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "level.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"config": {"game": {"speed": 6}}, "obstacles": obstacles}, f)
+        results["load_game_from_json"] = _timed(lambda _r: load_game_from_json(path), repeat,
+                                                min_time)
+    return results
+
+
+def bench_ticks(n, ticks, repeat, seed, min_time=MIN_SAMPLE_SECONDS):
+    """Ticks completos de GameSimulation sobre un nivel sintético, con entradas aleatorias.
+    El árbol es un PersistentAVLTree, como el que arma levels.open_level para el juego."""
+    obstacles = synthetic_obstacles(n, seed)
+    rnd = random.Random(seed)
+    actions = (ACTION_UP, ACTION_DOWN, ACTION_JUMP)
+    inputs = {t: [rnd.choice(actions)] for t in range(1, ticks + 1) if rnd.random() < 0.05}
+
+    def run(_r):
+        tree = PersistentAVLTree.from_tree(
+            AVLTree.from_sorted([((o["x_world"], o["lane_idx"]), o) for o in obstacles]))
+        sim = GameSimulation(tree, {"game": {"speed": 6, "distance_total": 10 ** 12}})
+        # Vidas de sobra: se mide el costo del tick, no el final de la partida
+        sim.lives = float("inf")
+        t0 = time.perf_counter()
+        sim.run(ticks, inputs)
+        return time.perf_counter() - t0
+    return {"ticks": _timed(run, repeat, min_time, self_timed=True), "ticks_per_run": ticks}
+
+
+def run_all(sizes, ticks, repeat, seed, min_time=MIN_SAMPLE_SECONDS):
+    results = {}
+    for n in sizes:
+        for name, seconds in bench_tree(n, repeat, seed, min_time).items():
+            results[f"{name}/n={n}"] = seconds
+        tick = bench_ticks(n, ticks, repeat, seed, min_time)
+        results[f"game_tick/n={n}"] = tick["ticks"] / tick["ticks_per_run"]
+        print(f"n={n}: listo", file=sys.stderr)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "sizes": sizes,
+            "ticks": ticks,
+            "repeat": repeat,
+            "min_time": min_time,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, tolerance, noise_floor=NOISE_FLOOR):
+    """Devuelve {nombre: {"current", "baseline", "ratio", "regression"}} para las mediciones
+    comunes. Es regresión si supera la tolerancia relativa y también noise_floor segundos."""
+    report = {}
+    for name, seconds in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            continue
+        ratio = seconds / base
+        report[name] = {
+            "current": seconds,
+            "baseline": base,
+            "ratio": ratio,
+            "regression": ratio > 1 + tolerance and seconds - base > noise_floor,
+        }
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de AVLTree y del tick del juego")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="cantidades de obstáculos (p. ej. 1000 10000 100000 1000000)")
+    parser.add_argument("--ticks", type=int, default=2000, help="ticks simulados por tamaño")
+    parser.add_argument("--repeat", type=int, default=5, help="muestras; se toma la mediana")
+    parser.add_argument("--min-time", type=float, default=MIN_SAMPLE_SECONDS,
+                        help="segundos mínimos acumulados por muestra")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="archivo JSON de salida (por defecto stdout)")
+    parser.add_argument("--baseline", help="JSON previo contra el cual comparar")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="margen de regresión permitido sobre el baseline (0.2 = 20%%)")
+    parser.add_argument("--noise-floor", type=float, default=NOISE_FLOOR,
+                        help="diferencia mínima en segundos para marcar una regresión")
+    args = parser.parse_args(argv)
+
+    data = run_all(args.sizes, args.ticks, args.repeat, args.seed, args.min_time)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            report = compare(data, json.load(f), args.tolerance, args.noise_floor)
+        data["comparison"] = {"baseline": args.baseline, "tolerance": args.tolerance,
+                              "noise_floor": args.noise_floor, "results": report}
+        regressions = [name for name, r in report.items() if r["regression"]]
+        data["comparison"]["regressions"] = regressions
+
+    text = json.dumps(data, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
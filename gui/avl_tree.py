@@ -1,26 +1,125 @@
+from collections import deque, namedtuple
+from contextlib import contextmanager
+
+# Eventos de cambio del árbol (ver AVLTree.subscribe)
+EVENT_INSERTED = "inserted"
+EVENT_DELETED = "deleted"
+EVENT_ROTATED = "rotated"
+EVENT_RANGE_EVICTED = "range_evicted"
+# El contenido se reemplazó entero (split, join, restore...): hay que volver a leer el árbol
+EVENT_RESET = "reset"
+
+# version: la del árbol tras el cambio. key: la clave insertada o eliminada, la raíz del
+# subárbol rotado o, en range_evicted, el umbral (x,) bajo el que se eliminó todo.
+# count: cantidad de rotaciones o de nodos desalojados (1 en el resto)
+TreeEvent = namedtuple("TreeEvent", "kind version key count")
+
 class AVLNode:
+    # Sin __dict__ por nodo: con millones de obstáculos la memoria la dominan los nodos
+    __slots__ = ("key", "obstacle", "height", "size", "left", "right")
+
     def __init__(self, key, obstacle):
         self.key = key
         self.obstacle = obstacle
         self.height = 1
+        # Cantidad de nodos del subárbol (estadísticas de orden: rank/select)
+        self.size = 1
         self.left = None
         self.right = None
 
 class AVLTree:
+    # Contadores de instrumentación (gui.perf): None o dict rotations/inserts/deletes/evictions.
+    # Son de cada árbol (PerfMonitor.enable); split y join los pasan a los árboles que crean
+    counters = None
+    # Suscriptores (callback, agrupado). La tupla se reemplaza al suscribir o desuscribir, así
+    # un callback puede desuscribirse mientras se notifica. Sin suscriptores no se crean eventos
+    _listeners = ()
+    _batch_depth = 0
+    _batched = None
+
     def __init__(self):
         self.root = None
+        # Versión estructural: aumenta con cada cambio del árbol (cachés de dibujo, etc.)
+        self.version = 0
 
     def get_height(self, node):
         return node.height if node else 0
 
+    def get_size(self, node):
+        return node.size if node else 0
+
     def get_balance(self, node):
         return self.get_height(node.left) - self.get_height(node.right) if node else 0
 
     def update_height(self, node):
+        """Recalcula altura y tamaño del nodo a partir de sus hijos."""
         node.height = 1 + max(self.get_height(node.left), self.get_height(node.right))
+        node.size = 1 + self.get_size(node.left) + self.get_size(node.right)
+
+    # ---------- eventos de cambio ----------
+    def subscribe(self, callback, batched=True):
+        """Llama a callback(eventos) con una lista de TreeEvent cada vez que el árbol cambia.
+        Los suscriptores agrupados reciben lo ocurrido dentro de batch() en un único aviso al
+        salir, con los eventos consecutivos de rotación, desalojo o reset fusionados; los
+        inmediatos (batched=False) reciben cada evento en el momento."""
+        self._listeners = self._listeners + ((callback, batched),)
+
+    def unsubscribe(self, callback):
+        self._listeners = tuple(entry for entry in self._listeners if entry[0] != callback)
+
+    @contextmanager
+    def batch(self):
+        """Agrupa los avisos a suscriptores agrupados (p. ej. todo un tick). Se puede anidar."""
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth and self._batched:
+                events, self._batched = self._batched, None
+                for callback, batched in self._listeners:
+                    if batched:
+                        callback(events)
+
+    def notify_reset(self):
+        """Registra un reemplazo completo del contenido (raíz asignada desde afuera, split...)."""
+        self.version += 1
+        if self._listeners:
+            self._emit(EVENT_RESET)
+
+    def _emit(self, kind, key=None, count=1):
+        # Los llamadores comprueban antes self._listeners
+        event = TreeEvent(kind, self.version, key, count)
+        has_batched = False
+        for callback, batched in self._listeners:
+            if batched:
+                has_batched = True
+            else:
+                callback([event])
+        if not has_batched:
+            return
+        if not self._batch_depth:
+            for callback, batched in self._listeners:
+                if batched:
+                    callback([event])
+            return
+        if self._batched is None:
+            self._batched = []
+        last = self._batched[-1] if self._batched else None
+        if last is not None and last.kind == kind and kind in (EVENT_ROTATED, EVENT_RANGE_EVICTED,
+                                                                 EVENT_RESET):
+            # Desalojos sucesivos equivalen a uno con el umbral mayor
+            key = max(last.key, key) if kind == EVENT_RANGE_EVICTED else key
+            self._batched[-1] = TreeEvent(kind, self.version, key, last.count + count)
+        else:
+            self._batched.append(event)
 
     # ---------- rotaciones ----------
     def rotate_right(self, y):
+        if self.counters is not None:
+            self.counters["rotations"] += 1
+        if self._listeners:
+            self._emit(EVENT_ROTATED, y.key)
         x = y.left
         T2 = x.right
         x.right = y
@@ -30,6 +129,10 @@ class AVLTree:
         return x
 
     def rotate_left(self, x):
+        if self.counters is not None:
+            self.counters["rotations"] += 1
+        if self._listeners:
+            self._emit(EVENT_ROTATED, x.key)
         y = x.right
         T2 = y.left
         y.left = x
@@ -38,96 +141,234 @@ class AVLTree:
         self.update_height(y)
         return y
 
+    # ---------- construcción masiva ----------
+    @classmethod
+    def from_sorted(cls, items):
+        """Construye un AVL perfectamente balanceado en O(n) a partir de pares (clave, obstáculo)
+        ya ordenados por clave y sin claves repetidas. Acepta cualquier secuencia indexable."""
+        if not hasattr(items, "__getitem__"):
+            items = list(items)
+        tree = cls()
+        tree.root = tree._build_sorted(items, 0, len(items))
+        return tree
+
+    @classmethod
+    def from_items(cls, items):
+        """Ordena los pares (clave, obstáculo) una sola vez y construye el árbol con from_sorted.
+        Ante claves repetidas se conserva la primera aparición, igual que insert()."""
+        unique = []
+        for item in sorted(items, key=lambda item: item[0]):
+            if not unique or item[0] != unique[-1][0]:
+                unique.append(item)
+        return cls.from_sorted(unique)
+
+    def _build_sorted(self, items, lo, hi):
+        if lo >= hi:
+            return None
+        mid = (lo + hi) // 2
+        key, obstacle = items[mid]
+        node = AVLNode(key, obstacle)
+        node.left = self._build_sorted(items, lo, mid)
+        node.right = self._build_sorted(items, mid + 1, hi)
+        # Un rango de m elementos partido por la mitad tiene altura m.bit_length()
+        node.height = (hi - lo).bit_length()
+        node.size = hi - lo
+        return node
+
     # ---------- inserción ----------
     def insert(self, key, obstacle):
-        self.root = self._insert(self.root, key, obstacle)
-
-    def _insert(self, node, key, obstacle):
-        if not node:
-            return AVLNode(key, obstacle)
-        if key < node.key:
-            node.left = self._insert(node.left, key, obstacle)
-        elif key > node.key:
-            node.right = self._insert(node.right, key, obstacle)
+        """Inserción iterativa: baja guardando el camino y rebalancea de abajo hacia arriba."""
+        path = []
+        node = self.root
+        while node:
+            if key < node.key:
+                path.append(node)
+                node = node.left
+            elif key > node.key:
+                path.append(node)
+                node = node.right
+            else:
+                return
+        new = AVLNode(key, obstacle)
+        self.version += 1
+        if self.counters is not None:
+            self.counters["inserts"] += 1
+        if not path:
+            self.root = new
         else:
-            return node
-        self.update_height(node)
-        balance = self.get_balance(node)
-        if balance > 1 and key < node.left.key:
-            return self.rotate_right(node)
-        if balance < -1 and key > node.right.key:
-            return self.rotate_left(node)
-        if balance > 1 and key > node.left.key:
-            node.left = self.rotate_left(node.left)
-            return self.rotate_right(node)
-        if balance < -1 and key < node.right.key:
-            node.right = self.rotate_right(node.right)
-            return self.rotate_left(node)
-        return node
+            parent = path[-1]
+            if key < parent.key:
+                parent.left = new
+            else:
+                parent.right = new
+            self.root = self._rebalance_path(path)
+        if self._listeners:
+            self._emit(EVENT_INSERTED, key)
 
     # ---------- eliminación ----------
     def delete(self, key):
-        self.root = self._delete(self.root, key)
-
-    def _delete(self, node, key):
+        """Eliminación iterativa con pila explícita del camino raíz -> nodo eliminado."""
+        path = []
+        node = self.root
+        while node and key != node.key:
+            path.append(node)
+            node = node.left if key < node.key else node.right
         if not node:
-            return node
-        if key < node.key:
-            node.left = self._delete(node.left, key)
-        elif key > node.key:
-            node.right = self._delete(node.right, key)
+            return
+        self.version += 1
+        if self.counters is not None:
+            self.counters["deletes"] += 1
+        if node.left and node.right:
+            # Copiar el sucesor en el nodo y eliminar el sucesor (que no tiene hijo izquierdo)
+            path.append(node)
+            succ = node.right
+            while succ.left:
+                path.append(succ)
+                succ = succ.left
+            node.key = succ.key
+            node.obstacle = succ.obstacle
+            node = succ
+        child = node.left or node.right
+        if not path:
+            self.root = child
         else:
-            if not node.left:
-                return node.right
-            elif not node.right:
-                return node.left
-            temp = self.get_min(node.right)
-            node.key = temp.key
-            node.obstacle = temp.obstacle
-            node.right = self._delete(node.right, temp.key)
-        if not node:
-            return node
-        self.update_height(node)
-        balance = self.get_balance(node)
-        if balance > 1 and self.get_balance(node.left) >= 0:
-            return self.rotate_right(node)
-        if balance > 1 and self.get_balance(node.left) < 0:
-            node.left = self.rotate_left(node.left)
-            return self.rotate_right(node)
-        if balance < -1 and self.get_balance(node.right) <= 0:
-            return self.rotate_left(node)
-        if balance < -1 and self.get_balance(node.right) > 0:
-            node.right = self.rotate_right(node.right)
-            return self.rotate_left(node)
-        return node
+            parent = path[-1]
+            if parent.left is node:
+                parent.left = child
+            else:
+                parent.right = child
+            self.root = self._rebalance_path(path)
+        if self._listeners:
+            self._emit(EVENT_DELETED, key)
+
+    def _rebalance_path(self, path):
+        """Actualiza alturas y rota desde el final del camino hacia path[0].
+        Se detiene en cuanto un subárbol conserva su altura. Devuelve la nueva raíz de path[0]."""
+        for i in range(len(path) - 1, -1, -1):
+            node = path[i]
+            old_height = node.height
+            sub = self._delete_balance(node)
+            if i == 0:
+                return sub
+            parent = path[i - 1]
+            if parent.left is node:
+                parent.left = sub
+            else:
+                parent.right = sub
+            if sub.height == old_height:
+                # Más arriba las alturas no cambian; solo falta actualizar los tamaños
+                for ancestor in reversed(path[:i]):
+                    ancestor.size = 1 + self.get_size(ancestor.left) + self.get_size(ancestor.right)
+                return path[0]
+
+    def _pop_min(self, node):
+        """Quita el mínimo del subárbol node. Devuelve (nodo mínimo suelto, nueva raíz)."""
+        path = []
+        while node.left:
+            path.append(node)
+            node = node.left
+        if not path:
+            root = node.right
+        else:
+            path[-1].left = node.right
+            root = self._rebalance_path(path)
+        node.right = None
+        return node, root
 
     def get_min(self, node):
         while node.left:
             node = node.left
         return node
 
-    # ---------- limpieza de pasados ----------
-    def remove_passed_obstacles(self, world_offset, margin=100):
-        """Elimina del árbol los obstáculos que ya han sido superados por el jugador."""
-        threshold = world_offset - margin
-        self.root = self._remove_passed_recursive(self.root, threshold)
+    def get_max(self, node):
+        while node.right:
+            node = node.right
+        return node
 
-    def _remove_passed_recursive(self, node, threshold):
-        """Recorre y elimina nodos recursivamente si su clave es menor que el umbral."""
+    # ---------- split / join ----------
+    def split(self, key):
+        """Parte el árbol en dos AVL: (claves < key, claves >= key). Este árbol queda vacío. O(log n)."""
+        left, right = type(self)(), type(self)()
+        if self.counters is not None:
+            left.counters = right.counters = self.counters
+        left.root, right.root = self._split(self.root, key)
+        self.root = None
+        self.notify_reset()
+        return left, right
+
+    @classmethod
+    def join(cls, left, right):
+        """Une dos AVL donde toda clave de left es menor que toda clave de right. O(log n).
+        Los árboles de entrada quedan vacíos."""
+        tree = cls()
+        if left.counters is not None:
+            tree.counters = left.counters
+        tree.root = tree._join2(left.root, right.root)
+        left.root = right.root = None
+        left.notify_reset()
+        right.notify_reset()
+        return tree
+
+    def _join(self, left, node, right):
+        """Une left < node < right en un AVL válido descendiendo por el lado más alto."""
+        hl, hr = self.get_height(left), self.get_height(right)
+        if hl > hr + 1:
+            left.right = self._join(left.right, node, right)
+            return self._delete_balance(left)
+        if hr > hl + 1:
+            right.left = self._join(left, node, right.left)
+            return self._delete_balance(right)
+        node.left, node.right = left, right
+        self.update_height(node)
+        return node
+
+    def _join2(self, left, right):
+        """Une dos AVL sin nodo intermedio usando el mínimo de right como pivote."""
+        if not left:
+            return right
+        if not right:
+            return left
+        pivot, right = self._pop_min(right)
+        return self._join(left, pivot, right)
+
+    def _split(self, node, key):
+        """Devuelve las raíces (claves < key, claves >= key) del subárbol node."""
         if not node:
-            return None
+            return None, None
+        left, right = node.left, node.right
+        if key <= node.key:
+            lo, hi = self._split(left, key)
+            return lo, self._join(hi, node, right)
+        lo, hi = self._split(right, key)
+        return self._join(left, node, lo), hi
 
-        node.right = self._remove_passed_recursive(node.right, threshold)
+    def _split_right(self, node, key):
+        """Como _split, pero solo construye la parte con claves >= key (la otra se descarta)."""
+        if not node:
+            return None
+        if node.key < key:
+            return self._split_right(node.right, key)
+        right = node.right
+        return self._join(self._split_right(node.left, key), node, right)
 
-        # Comparamos solo con la coordenada X de la clave
-        if node.key[0] < threshold:
-            return node.right
-        else:
-            node.left = self._remove_passed_recursive(node.left, threshold)
-            return self._delete_balance(node)
+    # ---------- limpieza de pasados ----------
+    def remove_passed_obstacles(self, world_offset, margin=100):
+        """Elimina del árbol los obstáculos que ya han sido superados por el jugador.
+        Es una eliminación de prefijo (x < umbral) hecha con split: O(log n) y deja un AVL válido."""
+        threshold = world_offset - margin
+        if self.root and self.get_min(self.root).key[0] < threshold:
+            # (threshold,) es menor que cualquier clave (threshold, carril)
+            before = self.root.size
+            self.version += 1
+            self.root = self._split_right(self.root, (threshold,))
+            evicted = before - self.get_size(self.root)
+            if self.counters is not None:
+                self.counters["evictions"] += evicted
+            if self._listeners:
+                self._emit(EVENT_RANGE_EVICTED, (threshold,), evicted)
 
     def _delete_balance(self, node):
-        """Función auxiliar para rebalancear un nodo después de una eliminación."""
+        """Función auxiliar para rebalancear un nodo después de una eliminación, split o join."""
         if not node:
             return node
 
@@ -155,54 +396,129 @@ class AVLTree:
         return node
 
     # ---------- recorridos ----------
-    def inorder(self):
-        result = []
-        self._inorder(self.root, result)
-        return result
+    # Los iter_* son generadores perezosos (pila/cola explícita, sin recursión): se pueden
+    # consumir de forma incremental y cortar en cualquier momento (break, itertools.islice).
+    def iter_inorder(self):
+        stack = []
+        push, pop = stack.append, stack.pop
+        node = self.root
+        while True:
+            while node:
+                push(node)
+                node = node.left
+            if not stack:
+                return
+            node = pop()
+            yield node
+            node = node.right
 
-    def preorder(self):
-        result = []
-        self._preorder(self.root, result)
-        return result
+    def iter_preorder(self):
+        stack = [self.root] if self.root else []
+        push, pop = stack.append, stack.pop
+        while stack:
+            node = pop()
+            yield node
+            if node.right:
+                push(node.right)
+            if node.left:
+                push(node.left)
 
-    def postorder(self):
-        result = []
-        self._postorder(self.root, result)
-        return result
+    def iter_postorder(self):
+        stack = []
+        push, pop = stack.append, stack.pop
+        node, last = self.root, None
+        while stack or node:
+            if node:
+                push(node)
+                node = node.left
+                continue
+            top = stack[-1]
+            if top.right and top.right is not last:
+                node = top.right
+            else:
+                yield top
+                last = pop()
 
-    def bfs(self):
+    def iter_bfs(self):
         if not self.root:
-            return []
-        result, queue = [], [self.root]
+            return
+        queue = deque([self.root])
+        push, popleft = queue.append, queue.popleft
         while queue:
-            node = queue.pop(0)
-            result.append(node)
+            node = popleft()
+            yield node
             if node.left:
-                queue.append(node.left)
+                push(node.left)
             if node.right:
-                queue.append(node.right)
-        return result
+                push(node.right)
 
-    def _inorder(self, node, result):
-        if not node:
-            return
-        self._inorder(node.left, result)
-        result.append(node)
-        self._inorder(node.right, result)
-
-    def _preorder(self, node, result):
-        if node:
-            result.append(node)
-            self._preorder(node.left, result)
-            self._preorder(node.right, result)
-
-    def _postorder(self, node, result):
-        if node:
-            self._postorder(node.left, result)
-            self._postorder(node.right, result)
-            result.append(node)
+    def inorder(self):
+        return list(self.iter_inorder())
+
+    def preorder(self):
+        return list(self.iter_preorder())
+
+    def postorder(self):
+        return list(self.iter_postorder())
+
+    def bfs(self):
+        return list(self.iter_bfs())
+
+    # ---------- consultas por rango ----------
+    def range(self, x_lo, x_hi):
+        """Genera en orden los nodos cuya coordenada X cumple x_lo <= key[0] < x_hi.
+        Solo desciende por los subárboles que pueden intersectar el rango: O(log n + k)."""
+        stack = []
+        node = self.root
+        while stack or node:
+            if node:
+                if node.key[0] >= x_lo:
+                    stack.append(node)
+                    node = node.left
+                else:
+                    node = node.right
+            else:
+                node = stack.pop()
+                if node.key[0] >= x_hi:
+                    return
+                yield node
+                node = node.right
+
+    # ---------- estadísticas de orden ----------
+    def rank(self, key):
+        """Cantidad de claves estrictamente menores que key. O(log n)."""
+        rank = 0
+        node = self.root
+        while node:
+            if key <= node.key:
+                node = node.left
+            else:
+                rank += self.get_size(node.left) + 1
+                node = node.right
+        return rank
+
+    def select(self, k):
+        """Devuelve el nodo con la k-ésima clave más pequeña (desde 0). O(log n)."""
+        if not 0 <= k < self.get_size(self.root):
+            raise IndexError("select fuera de rango")
+        node = self.root
+        while True:
+            left_size = self.get_size(node.left)
+            if k < left_size:
+                node = node.left
+            elif k == left_size:
+                return node
+            else:
+                k -= left_size + 1
+                node = node.right
+
+    def count_range(self, x_lo, x_hi):
+        """Cantidad de nodos con x_lo <= key[0] < x_hi (mismo criterio que range). O(log n)."""
+        if x_hi <= x_lo:
+            return 0
+        return self.rank((x_hi,)) - self.rank((x_lo,))
 
     # ---------- conversión ----------
     def to_obstacles(self):
         """Devuelve lista de dicts con obstáculos en orden por x_world."""
-        return [n.obstacle for n in self.inorder()]
+        return [n.obstacle for n in self.iter_inorder()]
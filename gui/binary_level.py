@@ -0,0 +1,357 @@
+"""Formato binario compacto de niveles (.avlb) con carga por mmap.
+
+Estructura (little-endian):
+
+    cabecera   "<4sHHQI"  magia b"AVLB", versión, cantidad de tipos, cantidad de obstáculos,
+                          longitud del JSON de config
+    config     JSON en UTF-8 (el mismo objeto "config" de los niveles .json)
+    tipos      "<32s8s8sB" por tipo: nombre, color y text_color (UTF-8 rellenado con ceros) y
+                           bits de campos presentes (HAS_NAME, HAS_COLOR, HAS_TEXT_COLOR)
+    relleno    hasta múltiplo de 8
+    índice X   float64 por obstáculo: x_world ordenado (búsqueda binaria sin decodificar registros)
+    carriles   uint16 por obstáculo: lane_idx
+    x float    uint8 por obstáculo: 1 si x_world era float en el JSON
+    relleno    hasta múltiplo de 8
+    registros  "<qHHHB" por obstáculo: id, width, height, tipo y bits de campos presentes
+                        (HAS_ID, HAS_WIDTH, HAS_HEIGHT)
+
+Las claves (x_world, lane_idx) salen de las tres columnas, así que armar el árbol entero no
+decodifica ningún registro. Un campo que falta en el JSON queda marcado como ausente y sigue
+ausente al leerlo, así el juego le aplica sus propios valores por defecto. Los obstáculos van
+ordenados por (x_world, lane_idx) y sin claves repetidas, así que alimentan directamente
+AVLTree.from_sorted. Convertir un nivel JSON:
+
+    python -m gui.binary_level level1.json level1.avlb
+"""
+import bisect
+import gc
+import json
+import mmap
+import struct
+import sys
+from array import array
+from collections.abc import Mapping
+from itertools import repeat
+
+from gui.avl_tree import AVLTree
+from gui.json_loader import LevelStream
+
+MAGIC = b"AVLB"
+VERSION = 3
+HEADER = struct.Struct("<4sHHQI")
+TYPE = struct.Struct("<32s8s8sB")
+RECORD = struct.Struct("<qHHHB")
+
+# Bits de campos presentes de TYPE
+HAS_NAME = 1
+HAS_COLOR = 2
+HAS_TEXT_COLOR = 4
+ALL_TYPE_FIELDS = HAS_NAME | HAS_COLOR | HAS_TEXT_COLOR
+# Bits de campos presentes de RECORD
+HAS_ID = 1
+HAS_WIDTH = 2
+HAS_HEIGHT = 4
+ALL_RECORD_FIELDS = HAS_ID | HAS_WIDTH | HAS_HEIGHT
+
+ID_RANGE = (-(1 << 63), (1 << 63) - 1)
+U16_RANGE = (0, 0xFFFF)
+# Enteros que float64 representa sin pérdida
+X_EXACT = 1 << 53
+TYPE_FIELDS = ("name", "color", "text_color")
+_KNOWN_FIELDS = {"id", "x_world", "lane_idx", "width", "height", *TYPE_FIELDS}
+
+
+def _align8(offset):
+    return (offset + 7) & ~7
+
+
+class LazyObstacle(Mapping):
+    """Obstáculo respaldado por un registro del archivo: se decodifica al primer acceso."""
+    __slots__ = ("_level", "_i", "_data")
+
+    def __init__(self, level, i):
+        self._level = level
+        self._i = i
+        self._data = None
+
+    def _decoded(self):
+        if self._data is None:
+            self._data = self._level.obstacle(self._i)
+        return self._data
+
+    def __getitem__(self, name):
+        return self._decoded()[name]
+
+    def __iter__(self):
+        return iter(self._decoded())
+
+    def __len__(self):
+        return len(self._decoded())
+
+    def copy(self):
+        return dict(self._decoded())
+
+
+class BinaryLevel:
+    """Nivel .avlb abierto con mmap; solo se decodifican los registros que se piden."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, type_count, count, config_len = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} no es un nivel binario (.avlb)")
+        if version != VERSION:
+            raise ValueError(f"Versión de nivel binario no soportada: {version}")
+        self.count = count
+        offset = HEADER.size
+        self.config = json.loads(self._mm[offset:offset + config_len].decode("utf-8"))
+        offset += config_len
+        self.types = []
+        for _ in range(type_count):
+            name, color, text_color, present = TYPE.unpack_from(self._mm, offset)
+            kind = {}
+            if present & HAS_NAME:
+                kind["name"] = name.rstrip(b"\0").decode("utf-8")
+            if present & HAS_COLOR:
+                kind["color"] = color.rstrip(b"\0").decode("ascii")
+            if present & HAS_TEXT_COLOR:
+                kind["text_color"] = text_color.rstrip(b"\0").decode("ascii")
+            self.types.append(kind)
+            offset += TYPE.size
+        index_offset = _align8(offset)
+        lanes_offset = index_offset + 8 * count
+        self._float_offset = lanes_offset + 2 * count
+        self._records_offset = _align8(self._float_offset + count)
+        view = memoryview(self._mm)
+        self._views = [view[index_offset:lanes_offset], view[lanes_offset:self._float_offset],
+                       view[self._float_offset:self._float_offset + count]]
+        self.x_index = self._column(self._views[0], "d")
+        self.lanes = self._column(self._views[1], "H")
+        self.x_float = self._views[2]
+        # Con todas las x enteras (lo habitual) las claves se arman sin mirar x_float
+        self.has_float_x = self._mm.find(b"\1", self._float_offset, self._float_offset + count) != -1
+
+    def _column(self, view, typecode):
+        if sys.byteorder == "little":
+            return view.cast(typecode)
+        # array(tipo, memoryview) recorrería byte por byte: hay que leer los bytes crudos
+        column = array(typecode)
+        column.frombytes(view)
+        column.byteswap()
+        return column
+
+    def __len__(self):
+        return self.count
+
+    def key(self, i):
+        x_world = self.x_index[i]
+        return (x_world if self.x_float[i] else int(x_world), self.lanes[i])
+
+    def keys(self, lo=0, hi=None):
+        """Claves de los obstáculos lo..hi-1, solo desde las columnas (sin leer registros)."""
+        hi = self.count if hi is None else hi
+        xs, lanes = self.x_index[lo:hi], self.lanes[lo:hi]
+        if not self.has_float_x:
+            return list(zip(map(int, xs), lanes))
+        return [(x if is_float else int(x), lane)
+                for x, lane, is_float in zip(xs, lanes, self.x_float[lo:hi])]
+
+    def obstacle(self, i):
+        """Decodifica el registro i al mismo dict que tendría en el nivel JSON."""
+        ob_id, width, height, type_id, flags = RECORD.unpack_from(
+            self._mm, self._records_offset + i * RECORD.size)
+        ob = {"id": ob_id} if flags & HAS_ID else {}
+        ob.update(self.types[type_id])
+        ob["x_world"], ob["lane_idx"] = self.key(i)
+        if flags & HAS_WIDTH:
+            ob["width"] = width
+        if flags & HAS_HEIGHT:
+            ob["height"] = height
+        return ob
+
+    def bisect(self, x_world):
+        """Índice del primer registro con x_world >= x_world (usa solo el índice X)."""
+        return bisect.bisect_left(self.x_index, x_world)
+
+    def items(self, lo=0, hi=None):
+        """Pares (clave, LazyObstacle) de los obstáculos lo..hi-1, para from_sorted."""
+        hi = self.count if hi is None else hi
+        return list(zip(self.keys(lo, hi), map(LazyObstacle, repeat(self), range(lo, hi))))
+
+    def to_tree(self, x_lo=None, x_hi=None):
+        """AVL balanceado de los registros con x_lo <= x_world < x_hi, en O(k) y sin ordenar."""
+        lo = 0 if x_lo is None else self.bisect(x_lo)
+        hi = self.count if x_hi is None else self.bisect(x_hi)
+        # Solo se crean nodos, tuplas y LazyObstacle, sin ciclos: con el recolector de basura
+        # activo se recorrería el heap varias veces durante la carga sin liberar nada
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return AVLTree.from_sorted(self.items(lo, hi))
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+    def close(self):
+        # Las vistas sobre el mmap deben liberarse antes de cerrarlo
+        for column in (self.x_index, self.lanes):
+            if isinstance(column, memoryview):
+                column.release()
+        for view in self._views:
+            view.release()
+        self.x_index = self.lanes = self.x_float = None
+        self._mm.close()
+
+
+class BinaryLevelStream(LevelStream):
+    """LevelStream sobre un nivel .avlb: mismos tramos guiados por world_offset, sin parseo."""
+
+    def _open(self, path, chunk_size):
+        self.level = BinaryLevel(path)
+        level = self.level
+        return level.config, (level.obstacle(i) for i in range(level.count))
+
+    def close(self):
+        if self.level.x_index is not None:
+            self.level.close()
+
+
+def load_game_from_binary(path: str):
+    """Equivalente a load_game_from_json para niveles .avlb: devuelve (config, avl)."""
+    level = BinaryLevel(path)
+    return level.config, level.to_tree()
+
+
+def open_binary_level_stream(path: str, lookahead=10000):
+    stream = BinaryLevelStream(path, lookahead=lookahead)
+    return stream.config, stream.avl, stream
+
+
+def _encode(text, size, encoding):
+    raw = text.encode(encoding)
+    if len(raw) > size:
+        raise ValueError(f"'{text}' excede {size} bytes en el formato binario")
+    return raw
+
+
+def _checked_int(ob, i, field, limits):
+    value = ob[field]
+    lo, hi = limits
+    if not isinstance(value, int) or isinstance(value, bool) or not lo <= value <= hi:
+        raise ValueError(f"obstáculo {i}: {field} debe ser un entero entre {lo} y {hi}, "
+                         f"no {value!r}")
+    return value
+
+
+def _checked_x(ob, i):
+    x_world = ob["x_world"]
+    if isinstance(x_world, bool) or not isinstance(x_world, (int, float)) or float(x_world) != x_world:
+        raise ValueError(f"obstáculo {i}: x_world {x_world!r} no se puede guardar como float64")
+    return x_world
+
+
+def write_binary_level(path: str, config: dict, obstacles, exact=False):
+    """Escribe obstáculos (dicts del esquema JSON) en formato .avlb.
+    Se ordenan por (x_world, lane_idx) y ante claves repetidas se conserva la primera. Los
+    campos ausentes se guardan como ausentes; ids, tamaños o carriles que el formato no puede
+    representar lanzan ValueError antes de escribir nada. Con exact=True también lo hacen los
+    campos que el formato no guarda, así lo que se lee es igual a lo que se escribió."""
+    types, type_ids = [], {}
+    records = {}
+    lo_id, hi_id = ID_RANGE
+    hi_u16 = U16_RANGE[1]
+    for i, ob in enumerate(obstacles):
+        # Camino rápido para los casos comunes; lo demás lo validan _checked_x/_checked_int
+        x_world = ob["x_world"]
+        if type(x_world) is float:
+            if x_world != x_world:
+                _checked_x(ob, i)
+        elif type(x_world) is not int or not -X_EXACT <= x_world <= X_EXACT:
+            x_world = _checked_x(ob, i)
+        lane_idx = ob["lane_idx"]
+        if type(lane_idx) is not int or not 0 <= lane_idx <= hi_u16:
+            lane_idx = _checked_int(ob, i, "lane_idx", U16_RANGE)
+        key = (x_world, lane_idx)
+        if key in records:
+            continue
+        if exact and not ob.keys() <= _KNOWN_FIELDS:
+            raise ValueError(f"obstáculo {i}: campos que .avlb no guarda: "
+                             f"{sorted(ob.keys() - _KNOWN_FIELDS)}")
+        kind = (ob.get("name"), ob.get("color"), ob.get("text_color"))
+        if kind not in type_ids:
+            for field, value in zip(TYPE_FIELDS, kind):
+                if value is not None and type(value) is not str:
+                    raise ValueError(f"obstáculo {i}: {field} debe ser un texto, no {value!r}")
+            type_ids[kind] = len(types)
+            types.append(kind)
+        if exact and None in kind and any(field in ob for field, value in zip(TYPE_FIELDS, kind)
+                                          if value is None):
+            raise ValueError(f"obstáculo {i}: .avlb no distingue un texto null de uno ausente")
+        flags = 0
+        ob_id = ob.get("id")
+        if ob_id is not None or "id" in ob:
+            if type(ob_id) is not int or not lo_id <= ob_id <= hi_id:
+                ob_id = _checked_int(ob, i, "id", ID_RANGE)
+            flags = HAS_ID
+        else:
+            ob_id = 0
+        width = ob.get("width")
+        if width is not None or "width" in ob:
+            if type(width) is not int or not 0 <= width <= hi_u16:
+                width = _checked_int(ob, i, "width", U16_RANGE)
+            flags |= HAS_WIDTH
+        else:
+            width = 0
+        height = ob.get("height")
+        if height is not None or "height" in ob:
+            if type(height) is not int or not 0 <= height <= hi_u16:
+                height = _checked_int(ob, i, "height", U16_RANGE)
+            flags |= HAS_HEIGHT
+        else:
+            height = 0
+        records[key] = (ob_id, width, height, type_ids[kind], flags)
+    if len(types) > U16_RANGE[1]:
+        raise ValueError(f"demasiados tipos de obstáculo distintos ({len(types)})")
+
+    config_bytes = json.dumps(config, ensure_ascii=False).encode("utf-8")
+    ordered = sorted(records)
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(types), len(ordered), len(config_bytes)))
+        f.write(config_bytes)
+        for name, color, text_color in types:
+            present = ((HAS_NAME if name is not None else 0) | (HAS_COLOR if color is not None else 0)
+                       | (HAS_TEXT_COLOR if text_color is not None else 0))
+            f.write(TYPE.pack(_encode(name or "", 32, "utf-8"), _encode(color or "", 8, "ascii"),
+                              _encode(text_color or "", 8, "ascii"), present))
+        offset = HEADER.size + len(config_bytes) + TYPE.size * len(types)
+        f.write(b"\0" * (_align8(offset) - offset))
+        xs = array("d", (x for x, _lane in ordered))
+        lanes = array("H", (lane for _x, lane in ordered))
+        if sys.byteorder != "little":
+            xs.byteswap()
+            lanes.byteswap()
+        f.write(xs.tobytes())
+        f.write(lanes.tobytes())
+        f.write(bytes(isinstance(x, float) for x, _lane in ordered))
+        offset = _align8(offset) + 11 * len(ordered)
+        f.write(b"\0" * (_align8(offset) - offset))
+        pack = RECORD.pack
+        for start in range(0, len(ordered), 1 << 16):
+            f.write(b"".join(pack(*records[key]) for key in ordered[start:start + (1 << 16)]))
+    return len(ordered)
+
+
+def convert_json_to_binary(json_path: str, out_path: str):
+    """Convierte un nivel del esquema JSON existente al formato .avlb."""
+    with open(json_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return write_binary_level(out_path, data.get("config", {}), data.get("obstacles", []))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("uso: python -m gui.binary_level entrada.json salida.avlb")
+    n = convert_json_to_binary(sys.argv[1], sys.argv[2])
+    print(f"{n} obstáculos escritos en {sys.argv[2]}")
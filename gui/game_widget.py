@@ -1,202 +1,297 @@
+import time
 from PyQt6.QtWidgets import QWidget
-from PyQt6.QtCore import QTimer, Qt, pyqtSignal
-from PyQt6.QtGui import QPainter, QColor, QBrush, QPen, QLinearGradient, QFont
-import math
-import random
+from PyQt6.QtCore import QTimer, Qt, QRect, pyqtSignal
+from PyQt6.QtGui import QPainter, QColor, QBrush, QPen, QLinearGradient, QFont, QPixmap, QRegion
+from gui.perf import PerfMonitor
+from gui.sprite_cache import SpriteCache
+from gui.simulation import (GameSimulation, ACTION_UP, ACTION_DOWN, ACTION_JUMP, ACTION_START,
+                            ACTION_ADD_OBSTACLE, ACTION_REWIND, ACTION_VIEW_WIDTH)
+
+# Obstáculos sin "color" en el nivel se dibujan rojos con la franja amarilla de siempre
+DEFAULT_OBSTACLE_COLOR = "#B91C1C"
+DEFAULT_OBSTACLE_STRIPE = "#FFFF00"
+# Margen transparente alrededor de cada sprite para el borde antialiasado
+SPRITE_MARGIN = 2
+# Alto de la franja pre-renderizada de cada línea discontinua
+DASH_BAND = 8
+# Pasos de simulación que un frame puede recuperar tras una pausa (p. ej. un frame lento);
+# el atraso que excede esto se descarta en vez de acumularse
+MAX_CATCH_UP_STEPS = 5
+# HUD de rendimiento (F3): esquina superior derecha, texto recalculado cada tantos frames
+PERF_HUD_WIDTH = 300
+PERF_HUD_LINE = 14
+PERF_HUD_REFRESH_FRAMES = 15
+
+def _sim_attr(name):
+    """Propiedad que delega en el atributo homónimo de GameSimulation."""
+    return property(lambda self: getattr(self.sim, name),
+                    lambda self, value: setattr(self.sim, name, value))
 
 class GameWidget(QWidget):
+    """Renderizador Qt de GameSimulation: traduce teclas a acciones, avanza la simulación
+    con un QTimer y dibuja su estado."""
     hit_signal = pyqtSignal()
     game_over_signal = pyqtSignal(str)
-
-    def __init__(self, avl_tree, config: dict, parent=None):
+    # Se emite con el PerfMonitor activo (o None) al mostrar/ocultar el HUD de rendimiento
+    perf_changed = pyqtSignal(object)
+
+    # Estado que otros widgets (MainWindow, TreeWidget) leen o ajustan directamente
+    avl_tree = _sim_attr("avl_tree")
+    config = _sim_attr("config")
+    speed = _sim_attr("speed")
+    goal_x = _sim_attr("goal_x")
+    refresh_ms = _sim_attr("refresh_ms")
+    world_offset = _sim_attr("world_offset")
+    lives = _sim_attr("lives")
+    lane_y = _sim_attr("lane_y")
+    obstacles = _sim_attr("obstacles")
+    running = _sim_attr("running")
+
+    def __init__(self, avl_tree, config: dict, parent=None, seed=None):
         super().__init__(parent)
-        self.avl_tree = avl_tree          
-        self.config = config or {}
-        self.speed = self.config.get("game", {}).get("speed", 6)
-        self.world_offset = 0
-        self.car_x = 0
-        # Control de ejecucion: hasta que no se "start()" el juego no avanza
-        self.running = False
-        # Cola de spawns. Se genera a partir del árbol y cada obstáculo tendrá x_world > world_offset
-        self._spawn_queue = []
-        self._prepared_spawns = False
-        # Timer de juego (no arrancar hasta que se pulse "Jugar")
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.update_game)
+        self.sim = GameSimulation(avl_tree, config, seed=seed)
+        self.sim.on_hit = lambda _ob: self.hit_signal.emit()
+        self.sim.on_game_over = self._on_game_over
+        # Acciones de teclado pendientes para el próximo tick
+        self._pending_inputs = []
+        # Repetición en pantalla (replay.Recording) y frames por tick del timer
+        self._replay = None
+        self._replay_speed = 1
+
+        # Capas estáticas renderizadas una vez por tamaño: fondo (césped, carretera, bordes) y
+        # una franja por línea discontinua, más larga que el widget para desplazarla
+        self._background = None
+        self._dash_strips = []
+        self._layers_key = None
+        # Zonas dibujadas en el frame anterior: hay que repintarlas para borrar lo que se movió
+        self._last_dirty = QRegion()
+
+        # Obstáculos pre-renderizados por (color, franja, ancho, alto, escala de pantalla)
+        self.sprites = SpriteCache(max_entries=256)
 
-        # Carro
-        self.car_x = 80
-        self.car_lane = 1
-        self.lane_y = [120, 200, 280, 360]
-        self.car_w, self.car_h = 100, 40
         self.car_color = QColor("#AAA0A0")
         self.car_color_jump = QColor("#107EB9")
 
-        # Ruedas
-        self.wheel_r = 13
-        self.wheel_angle = 0.0
-
-        # Salto
-        self.jumping = False
-        self.jump_height = 70
-        self.jump_progress = 0
-        self.jump_max = 35
-
-        # Obstáculos
-        self.obstacles = []
-        self.lives = 1.0
-
-        # Animación de líneas de carretera
-        self.road_line_offset = 0
-
-        # Meta
-        self.goal_x = 10000 
-
-        # AVL
-        self.avl = None
-
-        # Timer de juego (no arrancar hasta que se pulse "Jugar")
+        # HUD de rendimiento: líneas de texto ya calculadas y frame en que se calcularon
+        self._perf_lines = []
+        self._perf_lines_frame = 0
+        # Aviso de la última exportación de la traza (F4), como última línea del HUD
+        self._perf_note = None
+        self._perf_font = QFont("Monospace", 8)
+        self._perf_font.setStyleHint(QFont.StyleHint.TypeWriter)
+
+        # Bucle de paso fijo: el timer dispara frames al ritmo de la pantalla y cada frame
+        # ejecuta los step() que tocan según un reloj monótono (uno cada sim.refresh_ms).
+        # El dibujo interpola entre el estado anterior y el actual con _alpha.
+        self._accumulator = 0.0
+        self._last_frame_time = None
+        self._alpha = 1.0
+        self._prev_offset = self.sim.world_offset
+        self._prev_car_y = self.sim.car_y()
+
+        # Timer de juego: corre desde el inicio, pero el mundo no avanza hasta start()
         self.timer = QTimer(self)
-        self.timer.timeout.connect(self.update_game)
-        self.timer.start(30)
-
-    def sync_obstacles_from_avl(self, avl):
-        """
-        Sincroniza obstáculos visibles con el árbol AVL.
-        Solo se muestran los que estén adelante del carro.
-        """
-        # Mantener referencia al árbol; forzar regeneración de spawns cuando el árbol cambie
-        self.avl_tree = avl
-        self._prepared_spawns = False
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.timeout.connect(self._on_frame)
+        self._start_timer()
 
     def set_obstacles(self, obs: list):
         """Establece la lista de obstáculos visibles en el juego"""
-        self.obstacles = [
-            {**o, "spawn_x": o.get("spawn_x", o.get("x_world", 0))}
-            for o in obs
-        ]
+        self.sim.set_obstacles(obs)
+
+    def _start_timer(self):
+        if self.timer.isActive():
+            return
+        screen = self.screen()
+        rate = screen.refreshRate() if screen else 60
+        self.timer.start(max(4, int(1000 / max(1.0, rate))))
+        self._last_frame_time = None
+
+    def _on_frame(self):
+        """Un frame de pantalla: los pasos de simulación debidos según el reloj (como mucho
+        MAX_CATCH_UP_STEPS) y un repintado interpolado."""
+        now = time.monotonic()
+        if self._last_frame_time is None:
+            # Primer frame desde que arrancó el timer: el próximo paso llega en refresh_ms
+            self._last_frame_time = now
+            self._accumulator = 0.0
+        self._accumulator += now - self._last_frame_time
+        self._last_frame_time = now
+        step_time = self.sim.refresh_ms / 1000
+        steps = 0
+        while self._accumulator >= step_time and steps < MAX_CATCH_UP_STEPS:
+            self._advance()
+            self._accumulator -= step_time
+            steps += 1
+            if not self.timer.isActive():
+                # Terminó la partida o la repetición
+                self._accumulator = 0.0
+                break
+        if steps == MAX_CATCH_UP_STEPS:
+            self._accumulator = min(self._accumulator, step_time)
+        self._alpha = min(1.0, self._accumulator / step_time)
+        self._update_dirty()
 
     def update_game(self):
-        # Avanzar sólo si el juego está en ejecución (presionaron "Jugar")
-        if self.running:
-            self.world_offset += self.speed
-        self.road_line_offset = self.world_offset % 40
-
-        # Preparar spawns desde el AVL si no se hizo todavía
-        if not self._prepared_spawns and self.avl_tree and self.avl_tree.root:
-            self._prepare_spawns_from_avl()
-            self._prepared_spawns = True
-
-        # Asegurar que los spawns (aunque estén fuera de pantalla) estén en self.obstacles
-        if self._spawn_queue:
-            existing_ids = {o.get("id") for o in self.obstacles}
-            for ob in list(self._spawn_queue):
-                if ob.get("id") not in existing_ids:
-                    self.obstacles.append(ob)
-                    existing_ids.add(ob.get("id"))
-
-        # Eliminar obstáculos que ya pasaron
-        car_world_x = self.world_offset + self.car_x
-        if self.avl_tree:
-            self.avl_tree.remove_passed_obstacles(car_world_x)
-
-        # Sólo tomar obstáculos directamente desde el AVL si NO estamos usando la cola de spawns.
-        if not self._spawn_queue and self.avl_tree:
-            # to_obstacles() debe devolver plantillas sin x_world (el juego las posicionará)
-            self.obstacles = self.avl_tree.to_obstacles()
-
-        
-        # Salto
-        if self.jumping:
-            self.jump_progress += 1
-            if self.jump_progress >= self.jump_max:
-                
-                self.jumping = False
-                self.jump_progress = 0
- 
-        # Rotación ruedas
-        circ = 2 * math.pi * self.wheel_r
-        if circ > 0:
-            self.wheel_angle = (self.wheel_angle + (self.speed / circ) * 360) % 360
- 
-        # Colisiones
-        if not self.jumping:
-            car_rect = (self.car_x, self.car_y() - self.car_h,
-                        self.car_w, self.car_h)
-            for ob in list(self.obstacles):
-                
-                # calcular rect para obstáculo en pantalla (con x_world moviéndose por world_offset)
-                ob_screen_x = ob["x_world"] - self.world_offset
-                ob_rect = (
-                    ob_screen_x,
-                    self.lane_y[ob.get("lane_idx", 1)] - ob.get("height", 32),
-                    ob.get("width", 32),
-                    ob.get("height", 32),
-                )
-                if self.check_collision(car_rect, ob_rect):
-                    self.hit_signal.emit()
-
-                    if not ob.get("hit", False):
-                        self.lives -= 0.15
-                        self.lives = max(0.0, self.lives)
-                        ob["hit"] = True # marcar como golpeado para no descontar más vidas
-                    try:
-                        # eliminar obstáculo golpeado
-                        self.obstacles.remove(ob)
-                    except ValueError:
-                        pass
- 
-        # Eliminar obstáculos ya pasados
-        self.obstacles = [
-            ob for ob in self.obstacles
-            if ob["x_world"] - self.world_offset + ob["width"] > self.car_x
-        ]
- 
-        # Revisar fin de juego
-        if self.lives <= 0:
-            self.timer.stop()
-            self.game_over_signal.emit("Que mal, perdiste! No te quedan vidas.")
-        elif self.world_offset >= self.goal_x:
-            self.timer.stop()
-            self.game_over_signal.emit("Felicidades, ganaste! Llegaste a la meta.")
- 
-        self.update()
+        """Avanza un paso (o speed pasos en una repetición) y repinta sin interpolar."""
+        self._advance()
+        self._alpha = 1.0
+        self._update_dirty()
+
+    def _advance(self):
+        self._prev_offset = self.sim.world_offset
+        self._prev_car_y = self.sim.car_y()
+        if self._replay:
+            self._step_replay()
+        else:
+            inputs, self._pending_inputs = self._pending_inputs, []
+            self.sim.step(inputs)
+        if abs(self.sim.world_offset - self._prev_offset) > self.sim.speed:
+            # Salto (retroceso, checkpoint): no se interpola a través de él
+            self._prev_offset = self.sim.world_offset
+
+    def _render_offset(self):
+        """world_offset interpolado para dibujar entre dos pasos de simulación."""
+        prev = self._prev_offset
+        return round(prev + (self.sim.world_offset - prev) * self._alpha)
+
+    def _render_car_y(self):
+        prev = self._prev_car_y
+        return round(prev + (self.sim.car_y() - prev) * self._alpha)
+
+    def _update_dirty(self):
+        """Repinta solo lo que puede haber cambiado: lo que se dibujó en el frame anterior y lo
+        que se dibuja en este (líneas discontinuas, carro, obstáculos, meta y HUD)."""
+        perf = self.sim.perf
+        if perf and self.sim.frame - self._perf_lines_frame >= PERF_HUD_REFRESH_FRAMES:
+            self._perf_lines = perf.summary_lines()
+            self._perf_lines_frame = self.sim.frame
+        region = self._frame_region()
+        self.update(region.united(self._last_dirty))
+        self._last_dirty = region
+
+    def _frame_region(self):
+        sim = self.sim
+        width = self.width()
+        offset = self._render_offset()
+        region = QRegion()
+        if sim.running:
+            for y, _strip in self._dash_strips:
+                region += QRect(0, y - DASH_BAND // 2, width, DASH_BAND)
+        # Carro con cabina, luces, ruedas y sombra
+        y = self._render_car_y()
+        top = y - sim.car_h - 25
+        region += QRect(sim.car_x - 10, top, sim.car_w + 24, sim.lane_y[sim.car_lane] + 12 - top)
+        for ob in sim.obstacles:
+            x = ob["x_world"] - offset
+            if x + ob["width"] < 0 or x > width:
+                continue
+            sprite_w, sprite_h = self._sprite_size(ob["width"], ob["height"])
+            region += QRect(x - SPRITE_MARGIN, sim.lane_y[ob["lane_idx"]] - ob["height"] - SPRITE_MARGIN,
+                            sprite_w, sprite_h)
+        goal_screen_x = sim.goal_x - offset
+        if -50 < goal_screen_x < width:
+            region += QRect(goal_screen_x - 22, 50, 64, 352)
+        # Barra de vida y estadísticas del árbol
+        region += QRect((width - 500) // 2 - 2, 10, 504, 22)
+        region += QRect(10, 408, width - 20, 18)
+        if sim.perf:
+            region += self._perf_hud_rect()
+        return region
+
+    def replay(self, recording, speed=1):
+        """Repite una grabación en pantalla a speed veces la velocidad normal; el teclado se ignora.
+        La simulación debe haberse creado con la semilla de la grabación."""
+        self._replay = recording
+        self._replay_speed = max(1, int(speed))
+        self._pending_inputs = []
+        self._start_timer()
+
+    @property
+    def replaying(self):
+        return self._replay is not None
+
+    def _step_replay(self):
+        sim, recording = self.sim, self._replay
+        for _ in range(self._replay_speed):
+            if sim.frame >= recording.end_frame:
+                self._replay = None
+                self._pending_inputs = []
+                self.timer.stop()
+                return
+            sim.step(recording.inputs(sim.frame + 1))
+
+    def _on_game_over(self, msg):
+        self.timer.stop()
+        self.game_over_signal.emit(msg)
 
     def car_y(self):
         """Posición Y del carro con offset de salto"""
-        base = self.lane_y[self.car_lane]
-        if not self.jumping:
-            return base
-        # parabólica simple
-        peak = self.jump_max // 2
-        d = self.jump_progress - peak
-        return base - int(self.jump_height - (d * d * self.jump_height) / (peak * peak))
+        return self.sim.car_y()
 
     def check_collision(self, r1, r2):
-        x1, y1, w1, h1 = r1
-        x2, y2, w2, h2 = r2
-        return not (x1+w1 < x2 or x1 > x2+w2 or y1+h1 < y2 or y1 > y2+h2)
+        return GameSimulation.check_collision(r1, r2)
 
     def keyPressEvent(self, e):
-        if e.key() == Qt.Key.Key_Up and self.car_lane > 0:
-            self.car_lane -= 1
-        elif e.key() == Qt.Key.Key_Down and self.car_lane < len(self.lane_y)-1:
-            self.car_lane += 1
-        elif e.key() == Qt.Key.Key_Space and not self.jumping:
-            self.jumping = True
-            self.jump_progress = 0
+        if e.key() == Qt.Key.Key_Up:
+            self._pending_inputs.append(ACTION_UP)
+        elif e.key() == Qt.Key.Key_Down:
+            self._pending_inputs.append(ACTION_DOWN)
+        elif e.key() == Qt.Key.Key_Space:
+            self._pending_inputs.append(ACTION_JUMP)
+        elif e.key() == Qt.Key.Key_Backspace:
+            # Retroceder 3 segundos; si la partida había terminado, reanudar el timer
+            self._pending_inputs.append(ACTION_REWIND)
+            if self.sim.checkpoints:
+                self._start_timer()
+        elif e.key() == Qt.Key.Key_F3:
+            self.set_perf_enabled(not self.sim.perf)
+        elif e.key() == Qt.Key.Key_F4:
+            self.export_perf_trace()
         elif e.key() == Qt.Key.Key_Escape:
             if self.parent() and hasattr(self.parent(), "show_menu"):
                 self.parent().show_menu()
 
+    def resizeEvent(self, event):
+        self._pending_inputs.append((ACTION_VIEW_WIDTH, self.width()))
+        super().resizeEvent(event)
+
     def mousePressEvent(self, event):
         self.setFocus()
         super().mousePressEvent(event)
 
     def paintEvent(self, _event):
+        perf = self.sim.perf
+        if perf:
+            t0 = time.perf_counter()
         p = QPainter(self)
+        # Césped, carretera y bordes salen de la capa estática; las líneas discontinuas son
+        # franjas pre-renderizadas corridas road_line_offset
+        self._ensure_layers()
+        p.drawPixmap(0, 0, self._background)
+        for y, strip in self._dash_strips:
+            p.drawPixmap(-(self._render_offset() % 40), y - DASH_BAND // 2, strip)
+
+        p.setRenderHint(QPainter.RenderHint.Antialiasing)
+        self._draw_car(p)
+        self._draw_obstacles(p)
+        self._draw_goal(p)
+        self._draw_life_bar(p)
+        self._draw_tree_stats(p)
+        if perf:
+            self._draw_perf_hud(p)
+            p.end()
+            perf.record("paint_game", time.perf_counter() - t0)
+
+    def _ensure_layers(self):
+        dpr = self.devicePixelRatioF()
+        key = (self.width(), self.height(), dpr)
+        if self._layers_key == key:
+            return
+        self._layers_key = key
+        self._background = self._new_layer(self.width(), self.height(), dpr)
+        p = QPainter(self._background)
         p.setRenderHint(QPainter.RenderHint.Antialiasing)
-        
         # Fondo césped
         p.fillRect(self.rect(), QColor("#2D5016"))
         # Carretera
@@ -204,57 +299,71 @@ class GameWidget(QWidget):
         road_gradient.setColorAt(0, QColor("#404040"))
         road_gradient.setColorAt(1, QColor("#2A2A2A"))
         p.fillRect(0, 80, self.width(), 320, QBrush(road_gradient))
-
-        self._draw_road_lines(p)
-        self._draw_car(p)
-        self._draw_obstacles(p)
-        self._draw_goal(p)
-        self._draw_life_bar(p)
-
-    def _draw_road_lines(self, p: QPainter):
         p.setPen(QPen(QColor("white"), 4))
         p.drawLine(0, 80, self.width(), 80)
         p.drawLine(0, 400, self.width(), 400)
-
-        p.setPen(QPen(QColor("white"), 3))
-        for i in range(len(self.lane_y)-1):
-            y = (self.lane_y[i] + self.lane_y[i+1]) // 2
-            self._draw_dashed_line(p, y)
-        
-        center_y = (self.lane_y[1] + self.lane_y[2]) // 2
-        p.setPen(QPen(QColor("#FFD700"), 4))
-        self._draw_dashed_line(p, center_y, is_center=True)
-
-    def _draw_dashed_line(self, p: QPainter, y: int, is_center=False):
+        p.end()
+        self._dash_strips = self._render_dash_strips(dpr)
+
+    @staticmethod
+    def _new_layer(width, height, dpr):
+        pixmap = QPixmap(max(1, round(width * dpr)), max(1, round(height * dpr)))
+        pixmap.setDevicePixelRatio(dpr)
+        pixmap.fill(Qt.GlobalColor.transparent)
+        return pixmap
+
+    def _render_dash_strips(self, dpr):
+        """Una franja por línea entre carriles (la central, amarilla encima de la blanca). Miden
+        el ancho del widget más el desplazamiento máximo (road_line_offset < 40)."""
+        lane_y = self.sim.lane_y
+        center_y = (lane_y[1] + lane_y[2]) // 2
+        length = self.width() + 40
+        strips = []
+        for i in range(len(lane_y)-1):
+            y = (lane_y[i] + lane_y[i+1]) // 2
+            strip = self._new_layer(length, DASH_BAND, dpr)
+            p = QPainter(strip)
+            p.setRenderHint(QPainter.RenderHint.Antialiasing)
+            p.setPen(QPen(QColor("white"), 3))
+            self._draw_dashed_line(p, DASH_BAND // 2, length)
+            if y == center_y:
+                p.setPen(QPen(QColor("#FFD700"), 4))
+                self._draw_dashed_line(p, DASH_BAND // 2, length, is_center=True)
+            p.end()
+            strips.append((y, strip))
+        return strips
+
+    @staticmethod
+    def _draw_dashed_line(p: QPainter, y: int, length: int, is_center=False):
         dash_length = 30 if is_center else 25
         gap_length = 15 if is_center else 12
-        x = -self.road_line_offset
-        while x < self.width():
-            if x + dash_length > 0:
-                p.drawLine(max(0, x), y, min(self.width(), x + dash_length), y)
+        x = 0
+        while x < length:
+            p.drawLine(x, y, min(length, x + dash_length), y)
             x += dash_length + gap_length
 
     def _draw_car(self, p: QPainter):
-        y = self.car_y()
-        color = self.car_color_jump if self.jumping else self.car_color
+        sim = self.sim
+        y = self._render_car_y()
+        color = self.car_color_jump if sim.jumping else self.car_color
         # Sombra
-        if not self.jumping or self.jump_progress < 8:
-            shadow_y = self.lane_y[self.car_lane] + 3
+        if not sim.jumping or sim.jump_progress < 8:
+            shadow_y = sim.lane_y[sim.car_lane] + 3
             p.setBrush(QBrush(QColor(0, 0, 0, 80)))
             p.setPen(Qt.PenStyle.NoPen)
-            p.drawEllipse(self.car_x + 5, shadow_y - 15, self.car_w - 10, 20)
+            p.drawEllipse(sim.car_x + 5, shadow_y - 15, sim.car_w - 10, 20)
         # Chasis
-        gradient = QLinearGradient(0, y - self.car_h, 0, y)
+        gradient = QLinearGradient(0, y - sim.car_h, 0, y)
         gradient.setColorAt(0, color.lighter(140))
         gradient.setColorAt(0.5, color)
         gradient.setColorAt(1, color.darker(120))
         p.setBrush(QBrush(gradient))
         p.setPen(QPen(color.darker(150), 2))
-        p.drawRoundedRect(self.car_x, y - self.car_h, self.car_w, self.car_h, 6, 6)
+        p.drawRoundedRect(sim.car_x, y - sim.car_h, sim.car_w, sim.car_h, 6, 6)
         # Cabina y parabrisas
         cabin_w, cabin_h = 50, 25
-        cabin_x = self.car_x + 20
-        cabin_y = y - self.car_h - cabin_h + 5
+        cabin_x = sim.car_x + 20
+        cabin_y = y - sim.car_h - cabin_h + 5
         p.setBrush(QBrush(color.darker(130)))
         p.setPen(QPen(color.darker(160), 1))
         p.drawRoundedRect(cabin_x, cabin_y, cabin_w, cabin_h, 4, 4)
@@ -267,21 +376,21 @@ class GameWidget(QWidget):
         p.drawRect(cabin_x + cabin_w - 4, cabin_y + 8, 10, 15)
         # Luces y ruedas
         p.setBrush(QBrush(QColor("#606060")))
-        p.drawRect(self.car_x + self.car_w, y - self.car_h + 8, 6, 24)
+        p.drawRect(sim.car_x + sim.car_w, y - sim.car_h + 8, 6, 24)
         p.setBrush(QBrush(QColor("#FFFACD")))
         p.setPen(QPen(QColor("#DAA520"), 1))
-        p.drawEllipse(self.car_x + self.car_w + 2, y - self.car_h + 10, 8, 8)
-        p.drawEllipse(self.car_x + self.car_w + 2, y - self.car_h + 22, 8, 8)
+        p.drawEllipse(sim.car_x + sim.car_w + 2, y - sim.car_h + 10, 8, 8)
+        p.drawEllipse(sim.car_x + sim.car_w + 2, y - sim.car_h + 22, 8, 8)
         p.setBrush(QBrush(QColor("#DC143C")))
         p.setPen(Qt.PenStyle.NoPen)
-        p.drawEllipse(self.car_x - 3, y - self.car_h + 12, 6, 6)
-        p.drawEllipse(self.car_x - 3, y - self.car_h + 22, 6, 6)
+        p.drawEllipse(sim.car_x - 3, y - sim.car_h + 12, 6, 6)
+        p.drawEllipse(sim.car_x - 3, y - sim.car_h + 22, 6, 6)
         # Ruedas
-        self._draw_wheel(p, self.car_x + 20, y - 6)
-        self._draw_wheel(p, self.car_x + self.car_w - 20, y - 6)
+        self._draw_wheel(p, sim.car_x + 20, y - 6)
+        self._draw_wheel(p, sim.car_x + sim.car_w - 20, y - 6)
 
     def _draw_wheel(self, p: QPainter, cx: int, cy: int):
-        r = self.wheel_r
+        r = self.sim.wheel_r
         p.setBrush(QBrush(QColor(0, 0, 0, 100)))
         p.setPen(Qt.PenStyle.NoPen)
         p.drawEllipse(cx - r + 2, cy - r + 2, 2*r, 2*r)
@@ -301,7 +410,7 @@ class GameWidget(QWidget):
         p.drawEllipse(cx - center_r, cy - center_r, 2*center_r, 2*center_r)
         p.save()
         p.translate(cx, cy)
-        p.rotate(self.wheel_angle)
+        p.rotate(self.sim.wheel_angle)
         p.setPen(QPen(QColor("#707070"), 2))
         for _ in range(4):
             p.drawLine(0, 0, rim_r - 3, 0)
@@ -309,30 +418,61 @@ class GameWidget(QWidget):
         p.restore()
 
     def _draw_obstacles(self, p: QPainter):
-        for ob in self.obstacles:
-            ob_screen_x = ob["x_world"] - self.world_offset
-            y = self.lane_y[ob["lane_idx"]] - ob["height"]
+        sim = self.sim
+        view_w = self.width()
+        dpr = self.devicePixelRatioF()
+        offset = self._render_offset()
+        for ob in sim.obstacles:
+            ob_screen_x = ob["x_world"] - offset
             w = ob["width"]
+            if ob_screen_x + w < 0 or ob_screen_x > view_w:
+                continue
             h = ob["height"]
-            p.setBrush(QColor("#B91C1C"))
-            p.setPen(Qt.PenStyle.NoPen)
-            p.drawRect(ob_screen_x, y, w, h)
-            # Sombra
-            p.setBrush(QBrush(QColor(0, 0, 0, 120)))
-            p.drawEllipse(ob_screen_x + 2, self.lane_y[ob["lane_idx"]] + 2, w, h//2)
-            # Gradiente
-            grad = QLinearGradient(0, y, 0, self.lane_y[ob["lane_idx"]])
+            color = ob.get("color", DEFAULT_OBSTACLE_COLOR)
+            stripe = ob.get("text_color", DEFAULT_OBSTACLE_STRIPE)
+            sprite = self.sprites.get((color, stripe, w, h, dpr), self._sprite_size(w, h),
+                                      lambda pixmap: self._render_obstacle(pixmap, color, stripe, w, h), dpr)
+            y = sim.lane_y[ob["lane_idx"]] - h
+            p.drawPixmap(ob_screen_x - SPRITE_MARGIN, y - SPRITE_MARGIN, sprite)
+
+    @staticmethod
+    def _sprite_size(w, h):
+        # Obstáculo, su sombra (2 px abajo y h//2 de alto) y margen para el borde
+        return w + 2 + 2 * SPRITE_MARGIN, h + 2 + h // 2 + 2 * SPRITE_MARGIN
+
+    @staticmethod
+    def _render_obstacle(pixmap, color, stripe, w, h):
+        """Dibuja un obstáculo con su sombra; (0, 0) del obstáculo es (SPRITE_MARGIN, SPRITE_MARGIN)."""
+        p = QPainter(pixmap)
+        p.setRenderHint(QPainter.RenderHint.Antialiasing)
+        p.translate(SPRITE_MARGIN, SPRITE_MARGIN)
+        base = QColor(color)
+        p.setBrush(base)
+        p.setPen(Qt.PenStyle.NoPen)
+        p.drawRect(0, 0, w, h)
+        # Sombra
+        p.setBrush(QBrush(QColor(0, 0, 0, 120)))
+        p.drawEllipse(2, h + 2, w, h//2)
+        # Gradiente (los colores originales para el obstáculo rojo por defecto)
+        grad = QLinearGradient(0, 0, 0, h)
+        if color == DEFAULT_OBSTACLE_COLOR:
             grad.setColorAt(0, QColor("#FF4444"))
             grad.setColorAt(1, QColor("#CC0000"))
-            p.setBrush(QBrush(grad))
-            p.setPen(QPen(QColor("#AA0000"), 2))
-            p.drawRoundedRect(ob_screen_x, y, w, h, 4, 4)
-            # Línea decorativa
-            p.setPen(QPen(QColor("#FFFF00"), 2))
-            p.drawLine(ob_screen_x + 3, y + h//2, ob_screen_x + w - 3, y + h//2)
+            border = QColor("#AA0000")
+        else:
+            grad.setColorAt(0, base.lighter(135))
+            grad.setColorAt(1, base.darker(110))
+            border = base.darker(140)
+        p.setBrush(QBrush(grad))
+        p.setPen(QPen(border, 2))
+        p.drawRoundedRect(0, 0, w, h, 4, 4)
+        # Línea decorativa
+        p.setPen(QPen(QColor(stripe), 2))
+        p.drawLine(3, h//2, w - 3, h//2)
+        p.end()
 
     def _draw_goal(self, p: QPainter):
-        goal_screen_x = self.goal_x - self.world_offset
+        goal_screen_x = self.sim.goal_x - self._render_offset()
         if -50 < goal_screen_x < self.width():
             p.setBrush(QBrush(QColor("#FFD700")))
             p.setPen(QPen(QColor("#DAA520"), 2))
@@ -349,51 +489,80 @@ class GameWidget(QWidget):
         p.setBrush(QBrush(QColor("#444")))
         p.setPen(QPen(QColor("#222"), 2))
         p.drawRoundedRect(bar_x, bar_y, bar_width, bar_height, 8, 8)
-        lives_ratio = max(0.0, min(self.lives,1.0))
+        lives_ratio = max(0.0, min(self.sim.lives,1.0))
         life_color = QColor.fromRgbF(1 - lives_ratio, lives_ratio, 0)
         p.setBrush(QBrush(life_color))
         p.setPen(Qt.PenStyle.NoPen)
         p.drawRoundedRect(bar_x + 2, bar_y + 2, int((bar_width - 4) * lives_ratio), bar_height - 4, 6, 6)
 
-    def _prepare_spawns_from_avl(self):
-        """Genera una cola de obstáculos que aparecerán desde el borde derecho en orden aleatorio.
-        Usa las plantillas (dicts) del árbol y les asigna x_world > world_offset para que entren desde la derecha."""
-        if not self.avl_tree or not self.avl_tree.root:
-            return
-        # Obtener los obstáculos en orden (por su posición x_world)
-        templates = self.avl_tree.to_obstacles()
-        if not templates:
+    def _draw_tree_stats(self, p: QPainter):
+        """HUD con estadísticas del árbol, calculadas en O(log n) con rank/count_range."""
+        sim = self.sim
+        if not sim.avl_tree:
             return
+        car_world_x = sim.world_offset + sim.car_x
+        remaining = sim.avl_tree.get_size(sim.avl_tree.root) - sim.avl_tree.rank((car_world_x,))
+        upcoming = sim.avl_tree.count_range(car_world_x, car_world_x + 2000)
+        p.setFont(QFont("Segoe UI", 9, QFont.Weight.Bold))
+        p.setPen(QColor("#FFFFFF"))
+        p.drawText(10, 408, self.width() - 20, 18, Qt.AlignmentFlag.AlignLeft,
+                   f"Obstáculos restantes: {remaining}   Próximos 2000 px: {upcoming}")
+
+    def _perf_hud_lines(self):
+        lines = self._perf_lines or ["midiendo..."]
+        return lines + [self._perf_note] if self._perf_note else lines
+
+    def _perf_hud_rect(self):
+        height = PERF_HUD_LINE * len(self._perf_hud_lines()) + 8
+        return QRect(max(0, self.width() - PERF_HUD_WIDTH - 10), 40, PERF_HUD_WIDTH, height)
+
+    def _draw_perf_hud(self, p: QPainter):
+        """p50/p99 por fase (ms) de las últimas ventanas de PerfMonitor y contadores del árbol."""
+        rect = self._perf_hud_rect()
+        p.setPen(Qt.PenStyle.NoPen)
+        p.setBrush(QColor(0, 0, 0, 170))
+        p.drawRect(rect)
+        p.setFont(self._perf_font)
+        p.setPen(QColor("#7CFC00"))
+        for i, line in enumerate(self._perf_hud_lines()):
+            p.drawText(rect.x() + 6, rect.y() + 4 + i * PERF_HUD_LINE, rect.width() - 12,
+                       PERF_HUD_LINE, Qt.AlignmentFlag.AlignLeft, line)
+
+    # ---------- instrumentación ----------
+    def set_perf_enabled(self, enabled):
+        """Activa o desactiva la medición por fase y el HUD de rendimiento (F3)."""
+        sim = self.sim
+        if enabled and not sim.perf:
+            sim.perf = PerfMonitor()
+            sim.perf.enable(sim.avl_tree)
+            self._perf_lines = []
+            self._perf_note = None
+            self._perf_lines_frame = sim.frame
+        elif not enabled and sim.perf:
+            sim.perf.disable()
+            sim.perf = None
+        self.perf_changed.emit(sim.perf)
+        self.update()
+
+    def export_perf_trace(self, path=None):
+        """Exporta la traza por tick a CSV y JSON (F4) y lo avisa en el HUD. Sin medición activa
+        no hace nada."""
+        perf = self.sim.perf
+        if not perf:
+            return None
+        base = path or f"perf_trace_{self.sim.frame}"
+        for ext in (".csv", ".json"):
+            perf.export(base + ext)
+        self._perf_note = f"exportado: {base}.csv/.json"
+        self.update(self._perf_hud_rect())
+        return base
+
+    def add_random_obstacle(self):
+        """Pide a la simulación un obstáculo al azar en el próximo tick (queda en la grabación)."""
+        self._pending_inputs.append(ACTION_ADD_OBSTACLE)
 
-        for t in templates:
-            ob = t.copy()
-            if "id" not in ob:
-                ob["id"] = random.randint(100000, 999999)
-            ob.setdefault("width", 32)
-            ob.setdefault("height", 32)
-            self._spawn_queue.append(ob)
- 
-    def register_new_obstacle(self, template: dict):
-        """Registrar un nuevo obstáculo: lo agrega como spawn a la derecha (no se moverá si !running)."""
-        ob = template.copy()
-        ob.setdefault("width", 32)
-        ob.setdefault("height", 32)
-        if "id" not in ob:
-            ob["id"] = random.randint(100000, 999999)
-        # Ubicar a la derecha del viewport actual para que 'entre' desde la derecha
-        ob["x_world"] = self.world_offset + max(self.width(), 800) + 150 + random.randint(0, 300)
-        if "lane_idx" not in ob:
-            ob["lane_idx"] = random.randint(0, len(self.lane_y)-1)
-        self._spawn_queue.append(ob)
-        # Añadir también a self.obstacles para feedback visual inmediato (no se moverá hasta start)
-        self.obstacles.append(ob)
- 
     def start(self):
         """Iniciar la simulación: world_offset empezará a avanzar."""
-        # preparar spawns si aún no se hizo y empezar timer
-        if not self._prepared_spawns and self.avl_tree and self.avl_tree.root:
-            self._prepare_spawns_from_avl()
-            self._prepared_spawns = True
-        self.running = True
-        if not self.timer.isActive():
-            self.timer.start(30)
\ No newline at end of file
+        # los spawns se activan desde el árbol en cada tick; sólo falta arrancar el timer
+        self._pending_inputs.append(ACTION_START)
+        self._start_timer()
@@ -1,14 +1,13 @@
 from PyQt6.QtWidgets import QWidget, QHBoxLayout, QMessageBox
-from PyQt6.QtCore import QTimer
 from gui.avl_tree import AVLTree
 from gui.game_widget import GameWidget
 from gui.tree_widget import TreeWidget
 
 class GameplayWidget(QWidget):
-    def __init__(self, avl: AVLTree, parent=None):
+    def __init__(self, avl: AVLTree, parent=None, seed=None):
         super().__init__(parent)
         self.avl = avl
-        self.game = GameWidget(self.avl, {"game": {"speed": 6}})
+        self.game = GameWidget(self.avl, {"game": {"speed": 6}}, seed=seed)
         self.tree_w = TreeWidget(self.avl, parent=self)
 
         layout = QHBoxLayout(self)
@@ -18,10 +17,7 @@ class GameplayWidget(QWidget):
 
         self.game.hit_signal.connect(self.on_hit)
         self.game.game_over_signal.connect(self.on_game_over)
-
-        self.sync_timer = QTimer(self)
-        self.sync_timer.timeout.connect(self.sync_from_avl)
-        self.sync_timer.start(250)
+        self.game.perf_changed.connect(self.on_perf_changed)
 
     def on_hit(self):
         print("Jugador golpeado! Vidas:", self.game.lives)
@@ -30,11 +26,8 @@ class GameplayWidget(QWidget):
         QMessageBox.information(self, "Fin del Juego", msg)
         self.show_menu()
 
-    def sync_from_avl(self):
-        try:
-            self.tree_w.update()
-        except Exception:
-            pass
+    def on_perf_changed(self, perf):
+        self.tree_w.perf = perf
 
     def show_menu(self):
         if self.parent() and hasattr(self.parent(), "setCurrentIndex"):
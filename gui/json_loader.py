@@ -8,10 +8,196 @@ def load_game_from_json(path: str):
     config = data.get("config", {})
     obstacles = data.get("obstacles", [])
 
-    avl = AVLTree()
-    for obs in obstacles:
-        # La clave es una tupla (x_world, lane_idx)
-        key = (obs["x_world"], obs["lane_idx"])
-        avl.insert(key, obs)
+    # La clave es una tupla (x_world, lane_idx); se ordena una vez y se construye en O(n)
+    avl = AVLTree.from_items(((obs["x_world"], obs["lane_idx"]), obs) for obs in obstacles)
 
     return config, avl
+
+
+class UnsortedLevelError(ValueError):
+    """El nivel no está ordenado por x_world (o no lo declara): no se puede cargar por tramos."""
+
+
+class _JSONStreamReader:
+    """Lector incremental de JSON: mantiene solo un fragmento del archivo en memoria y
+    decodifica valores sueltos con json.JSONDecoder.raw_decode."""
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        data = self.f.read(self.chunk_size)
+        if not data:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Siguiente carácter que no sea espacio ("" al final del archivo)."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"JSON de nivel inválido: se esperaba '{char}' y se encontró '{found}'")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                obj, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # Un número al final del fragmento podría estar cortado ("12" de "1234")
+            if end == len(self.buf) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return obj
+
+
+class LevelStream:
+    """Carga por tramos de un nivel JSON, guiada por world_offset.
+
+    Lee el arreglo "obstacles" de forma incremental y solo mantiene en el árbol los obstáculos
+    hasta world_offset + lookahead; advance() trae el siguiente tramo a medida que el carro
+    avanza. Requiere que "config" y "sorted": true aparezcan antes de "obstacles" y que los
+    obstáculos vengan ordenados por x_world: sin la declaración el constructor lanza
+    UnsortedLevelError, y advance() la lanza en el primer obstáculo fuera de orden. Los que
+    llegan con x_world ya detrás del carro al empezar se descartan y se cuentan en dropped.
+    lookahead debe cubrir al menos el doble del viewport."""
+
+    def __init__(self, path: str, lookahead=10000, chunk_size=1 << 16, margin=100):
+        self.path = path
+        self.lookahead = lookahead
+        self.margin = margin
+        self.avl = AVLTree()
+        self.loaded = 0
+        self.dropped = 0
+        self.exhausted = False
+        # Hasta qué x_world están cargados todos los obstáculos leídos
+        self.frontier = float("-inf")
+        # x_world del último obstáculo leído, para detectar registros fuera de orden
+        self._last_x = float("-inf")
+        self._pending = None
+        self.config, self._records = self._open(path, chunk_size)
+        self.advance(0)
+
+    def _open(self, path, chunk_size):
+        """Abre la fuente del nivel. Devuelve (config, iterador de obstáculos por x_world)."""
+        self._in_obstacles = False
+        self._file = open(path, "r", encoding="utf-8")
+        self._reader = _JSONStreamReader(self._file, chunk_size)
+        self.header = self._read_header()
+        if self.header.get("sorted") is not True:
+            self.close()
+            raise UnsortedLevelError(f'{path} no declara "sorted": true antes de "obstacles"')
+        return self.header.get("config", {}), self._iter_obstacles()
+
+    def _read_header(self):
+        """Lee las claves de primer nivel hasta encontrar el arreglo "obstacles"."""
+        reader = self._reader
+        header = {}
+        reader.expect("{")
+        if reader.peek() == "}":
+            self._in_obstacles = False
+            return header
+        while True:
+            key = reader.value()
+            reader.expect(":")
+            if key == "obstacles":
+                reader.expect("[")
+                self._in_obstacles = True
+                return header
+            header[key] = reader.value()
+            if reader.peek() != ",":
+                reader.expect("}")
+                self._in_obstacles = False
+                return header
+            reader.pos += 1
+
+    def _iter_obstacles(self):
+        reader = self._reader
+        if not self._in_obstacles:
+            return
+        if reader.peek() == "]":
+            reader.pos += 1
+            return
+        while True:
+            yield reader.value()
+            if reader.peek() != ",":
+                reader.expect("]")
+                return
+            reader.pos += 1
+
+    def advance(self, world_offset):
+        """Asegura que estén en el árbol los obstáculos con x_world < world_offset + lookahead.
+        Lee un tramo nuevo solo cuando lo cargado cubre menos de la mitad del lookahead."""
+        if self.exhausted or self.frontier >= world_offset + self.lookahead / 2:
+            return
+        horizon = world_offset + self.lookahead
+        threshold = world_offset - self.margin
+        chunk = []
+        while True:
+            if self._pending is not None:
+                ob, self._pending = self._pending, None
+            else:
+                ob = next(self._records, None)
+                if ob is None:
+                    self.exhausted = True
+                    self.close()
+                    break
+                if ob["x_world"] < self._last_x:
+                    self.close()
+                    raise UnsortedLevelError(
+                        f"{self.path}: obstáculo con x_world {ob['x_world']} después de uno con "
+                        f"x_world {self._last_x}; los obstáculos deben venir ordenados")
+                self._last_x = ob["x_world"]
+            if ob["x_world"] >= horizon:
+                self._pending = ob
+                break
+            if ob["x_world"] < threshold:
+                self.dropped += 1
+                continue
+            chunk.append(((ob["x_world"], ob["lane_idx"]), ob))
+        self.frontier = float("inf") if self.exhausted else horizon
+        self._feed(chunk)
+
+    def _feed(self, chunk):
+        """Agrega un tramo al árbol: si todo el tramo queda a la derecha del árbol se une con
+        join en O(tramo + log n); si no, se inserta elemento por elemento."""
+        if not chunk:
+            return
+        part = AVLTree.from_items(chunk)
+        if not self.avl.root or self.avl.get_max(self.avl.root).key < part.get_min(part.root).key:
+            self.avl.root = AVLTree.join(self.avl, part).root
+            self.avl.notify_reset()
+        else:
+            for node in part.iter_inorder():
+                self.avl.insert(node.key, node.obstacle)
+        self.loaded += len(chunk)
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+def open_level_stream(path: str, lookahead=10000):
+    """Versión por tramos de load_game_from_json: devuelve (config, avl, stream)."""
+    stream = LevelStream(path, lookahead=lookahead)
+    return stream.config, stream.avl, stream
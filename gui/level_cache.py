@@ -0,0 +1,170 @@
+import copy
+import hashlib
+import os
+from collections import OrderedDict
+
+from gui.binary_level import VERSION as BINARY_VERSION, load_game_from_binary, write_binary_level
+from gui.json_loader import load_game_from_json
+from gui.persistent_avl import PersistentAVLTree
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "avl_tree_game", "levels")
+# Versión de lo que se guarda en disco; va en el nombre de cada archivo junto con la versión
+# del formato .avlb, así un cambio de cualquiera de los dos invalida la caché vieja
+CACHE_FORMAT = 1
+
+
+def file_digest(path):
+    """Hash (blake2b de 16 bytes) del contenido de un archivo, leído por bloques."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.digest()
+
+
+class _Entry:
+    __slots__ = ("size", "mtime_ns", "digest", "config", "avl")
+
+    def __init__(self, size, mtime_ns, digest, config, avl):
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.digest = digest
+        self.config = config
+        self.avl = avl
+
+
+class LevelCache:
+    """Caché en memoria y en disco de niveles ya construidos (config + árbol AVL).
+
+    En memoria la clave es la ruta del archivo, validada con tamaño y mtime; si éstos cambian
+    se compara el hash del contenido antes de descartar la entrada. En disco cada nivel se
+    guarda en formato .avlb (gui/binary_level.py), nombrado por el hash del contenido y las
+    versiones de formato: un arranque en frío lo abre por mmap en lugar de parsear el JSON, y
+    un archivo que no se puede abrir cuenta como fallo. Ambas capas tienen desalojo LRU: por
+    cantidad de niveles y de obstáculos en memoria, y por bytes en disco. Los niveles con
+    campos que .avlb no conserva solo se guardan en memoria.
+
+    Cada nivel se guarda como PersistentAVLTree y cada carga devuelve un snapshot() en O(1)
+    que comparte los nodos con él: el juego puede eliminar obstáculos superados (copia de
+    camino) sin tocar la versión guardada, y no se parsea JSON ni se ordena ni se rebalancea."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_entries=8, max_obstacles=2_000_000,
+                 max_disk_bytes=256 * 1024 * 1024, loader=load_game_from_json):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_obstacles = max_obstacles
+        self.max_disk_bytes = max_disk_bytes
+        self.loader = loader
+        self._memory = OrderedDict()
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "disk_evictions": 0}
+
+    def load(self, path: str):
+        """Igual que load_game_from_json(path), pero con un PersistentAVLTree que reutiliza
+        el nivel ya construido si no cambió."""
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        entry = self._memory.get(path)
+        if entry and (entry.size, entry.mtime_ns) == (st.st_size, st.st_mtime_ns):
+            return self._hit(path, entry)
+        digest = file_digest(path)
+        if entry and entry.digest == digest:
+            # Mismo contenido con otra fecha (p. ej. el archivo se volvió a guardar sin cambios)
+            entry.size, entry.mtime_ns = st.st_size, st.st_mtime_ns
+            return self._hit(path, entry)
+
+        cached = self._read_disk(digest)
+        if cached:
+            self.stats["disk_hits"] += 1
+            config, avl = cached
+        else:
+            self.stats["misses"] += 1
+            config, avl = self.loader(path)
+            self._write_disk(digest, config, avl)
+        entry = _Entry(st.st_size, st.st_mtime_ns, digest, config, PersistentAVLTree.from_tree(avl))
+        self._remember(path, entry)
+        return copy.deepcopy(entry.config), entry.avl.snapshot()
+
+    def describe(self):
+        s = self.stats
+        return (f"Caché de niveles: {s['hits']} aciertos en memoria, {s['disk_hits']} en disco, "
+                f"{s['misses']} fallos, {len(self._memory)} niveles en memoria")
+
+    def clear(self):
+        self._memory.clear()
+
+    def _hit(self, path, entry):
+        self.stats["hits"] += 1
+        self._memory.move_to_end(path)
+        return copy.deepcopy(entry.config), entry.avl.snapshot()
+
+    def _remember(self, path, entry):
+        self._memory[path] = entry
+        self._memory.move_to_end(path)
+        total = sum(e.avl.get_size(e.avl.root) for e in self._memory.values())
+        # Se conserva siempre la entrada recién agregada
+        while len(self._memory) > 1 and (len(self._memory) > self.max_entries or total > self.max_obstacles):
+            _path, old = self._memory.popitem(last=False)
+            total -= old.avl.get_size(old.avl.root)
+            self.stats["evictions"] += 1
+
+    # ---------- disco ----------
+    def _disk_path(self, digest):
+        return os.path.join(self.cache_dir, f"{digest.hex()}.c{CACHE_FORMAT}v{BINARY_VERSION}.avlb")
+
+    def _read_disk(self, digest):
+        if not self.cache_dir:
+            return None
+        path = self._disk_path(digest)
+        if not os.path.exists(path):
+            return None
+        try:
+            config, avl = load_game_from_binary(path)
+            # Marcar como usado recientemente para el LRU de disco
+            os.utime(path)
+            return config, avl
+        except Exception:
+            # Archivo truncado o dañado: se descarta y se vuelve a armar desde el nivel
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+    def _write_disk(self, digest, config, avl):
+        if not self.cache_dir:
+            return
+        path = self._disk_path(digest)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # exact=True: un nivel con campos que .avlb no conserva se queda solo en memoria
+            write_binary_level(tmp, config, (node.obstacle for node in avl.iter_inorder()),
+                               exact=True)
+            os.replace(tmp, path)
+            self._trim_disk()
+        except (OSError, ValueError):
+            # La caché en disco es opcional: sin permisos, sin espacio o con valores que .avlb
+            # no representa se sigue solo en memoria
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+    def _trim_disk(self):
+        files = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".avlb"):
+                st = os.stat(os.path.join(self.cache_dir, name))
+                files.append((st.st_mtime, st.st_size, name))
+        total = sum(size for _mtime, size, _name in files)
+        # Se conserva siempre el más reciente (el que se acaba de escribir)
+        for _mtime, size, name in sorted(files)[:-1]:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                # Abierto por mmap en otra plataforma: queda para el próximo recorte
+                continue
+            total -= size
+            self.stats["disk_evictions"] += 1
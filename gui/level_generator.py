@@ -0,0 +1,243 @@
+"""Generador procedural de niveles grandes para pruebas de carga.
+
+Reparte el recorrido en tramos de X del mismo largo y genera cada tramo en un proceso aparte
+(cada uno con su propia semilla derivada, así el resultado no depende de cuántos procesos se
+usen). Cada tramo sale ordenado por (x_world, lane_idx) y sin claves repetidas, y los tramos
+no se solapan: unirlos en orden es concatenarlos, y el nivel completo sirve directamente para
+AVLTree.from_sorted. Los tipos de obstáculo son los de gui.obstacle_types (los mismos que usa
+el botón "Agregar Obstáculo").
+
+    python -m gui.level_generator stress.avlb --count 10000000 --density 40 --difficulty 0.6
+    python -m gui.level_generator stress.json --count 100000 --lanes 1 2 2 1
+
+La salida es .avlb (ver gui/binary_level.py) o JSON con el esquema de level1.json según la
+extensión. Para millones de obstáculos conviene .avlb: el JSON ocupa unos 150 bytes por obstáculo.
+"""
+import argparse
+import bisect
+import itertools
+import json
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from gui.binary_level import (ALL_RECORD_FIELDS, ALL_TYPE_FIELDS, HEADER, MAGIC, RECORD, TYPE,
+                               VERSION, _align8, _encode)
+from gui.obstacle_types import OBSTACLE_TYPES
+
+# Carriles del juego (GameSimulation.lane_y)
+LANES = 4
+# Primer x_world posible, como en level1.json
+START_X = 500
+# Obstáculos por tramo: acota la memoria de cada proceso (un set de enteros del tramo)
+SHARD_SIZE = 250_000
+# Como mucho se ocupa esta fracción de las posiciones (x, carril) de cada tramo, para que
+# sortear posiciones sin repetir no se vuelva lento
+MAX_FILL = 0.5
+
+
+def level_config(count, density, vectorized=False):
+    """config del nivel: distance_total cubre todo el recorrido generado."""
+    length = math.ceil(count * 1000 / density)
+    game = {
+        "distance_total": START_X + length + 500,
+        "speed": 6,
+        "jump_height": 70,
+        "refresh_ms": 30,
+        "car_color": "#AAA0A0",
+    }
+    if vectorized:
+        game["vectorized"] = True
+    return {"game": game}
+
+
+def plan_shards(count, density, shard_size=SHARD_SIZE):
+    """Divide [START_X, START_X + largo) en tramos. Devuelve (x0, x1, cantidad, primer id)."""
+    length = math.ceil(count * 1000 / density)
+    shards = max(1, math.ceil(count / shard_size))
+    plan = []
+    next_id = 1
+    for i in range(shards):
+        x0 = START_X + length * i // shards
+        x1 = START_X + length * (i + 1) // shards
+        n = count // shards + (1 if i < count % shards else 0)
+        plan.append((x0, x1, n, next_id))
+        next_id += n
+    return plan
+
+
+def generate_shard(index, x0, x1, n, lane_weights, difficulty, seed):
+    """Claves del tramo [x0, x1) ordenadas y sin repetir, con tamaño y tipo de cada obstáculo.
+    Devuelve (xs, lanes, widths, heights, type_ids) como listas paralelas.
+
+    difficulty (0..1) agranda los obstáculos y hace más frecuentes las "paredes": varios
+    carriles ocupados en la misma x, que obligan a cambiar de carril o a saltar."""
+    rnd = random.Random(f"{seed}:{index}")
+    # random() y bisect en lugar de randrange/choices: es el bucle caliente con millones
+    rand = rnd.random
+    cum = list(itertools.accumulate(lane_weights))
+    total = cum[-1]
+    usable = sum(1 for w in lane_weights if w > 0)
+    wall_chance = 0.5 * difficulty if usable > 1 else 0.0
+    span = x1 - x0
+    # Clave codificada como x * LANES + carril: mismo orden que (x_world, lane_idx)
+    keys = set()
+    add = keys.add
+    while len(keys) < n:
+        x = (x0 + int(rand() * span)) * LANES
+        if rand() >= wall_chance:
+            add(x + bisect.bisect(cum, rand() * total))
+            continue
+        wall = set()
+        size = min(2 + int(rand() * (usable - 1)), n - len(keys))
+        while len(wall) < size:
+            wall.add(bisect.bisect(cum, rand() * total))
+        for lane in wall:
+            add(x + lane)
+    ordered = sorted(keys)
+    min_size, sizes = 24, 9 + int(16 * difficulty)
+    kinds = len(OBSTACLE_TYPES)
+    xs = [key // LANES for key in ordered]
+    lanes = [key % LANES for key in ordered]
+    widths = [min_size + int(rand() * sizes) for _ in ordered]
+    heights = [min_size + int(rand() * sizes) for _ in ordered]
+    type_ids = [int(rand() * kinds) for _ in ordered]
+    return xs, lanes, widths, heights, type_ids
+
+
+def _shard_job(args):
+    """Genera un tramo en un proceso del pool y lo escribe en archivos temporales."""
+    index, (x0, x1, n, first_id), lane_weights, difficulty, seed, fmt, tmp_dir = args
+    xs, lanes, widths, heights, type_ids = generate_shard(index, x0, x1, n, lane_weights,
+                                                          difficulty, seed)
+    base = os.path.join(tmp_dir, f"shard{index:06d}")
+    if fmt == "avlb":
+        index_path, lanes_path, records_path = base + ".idx", base + ".lane", base + ".rec"
+        for path, column in ((index_path, array("d", xs)), (lanes_path, array("H", lanes))):
+            if sys.byteorder != "little":
+                column.byteswap()
+            with open(path, "wb") as f:
+                f.write(column.tobytes())
+        pack = RECORD.pack
+        with open(records_path, "wb") as f:
+            f.write(b"".join(
+                pack(first_id + i, w, h, t, ALL_RECORD_FIELDS)
+                for i, (w, h, t) in enumerate(zip(widths, heights, type_ids))))
+        return index_path, lanes_path, records_path
+    # JSON: cada tipo se serializa una sola vez
+    kinds = [", ".join(f"{json.dumps(k)}: {json.dumps(t[k], ensure_ascii=False)}"
+                       for k in ("name", "color", "text_color")) for t in OBSTACLE_TYPES]
+    path = base + ".json"
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(",\n".join(
+            f'{{"id": {first_id + i}, {kinds[t]}, "x_world": {x}, "lane_idx": {lane}, '
+            f'"width": {w}, "height": {h}}}'
+            for i, (x, lane, w, h, t) in enumerate(zip(xs, lanes, widths, heights, type_ids))))
+    return path, None, None
+
+
+def _append(out, path):
+    with open(path, "rb") as f:
+        shutil.copyfileobj(f, out, 1 << 20)
+    os.remove(path)
+
+
+def generate_level(path, count, density=20.0, lane_weights=(1, 1, 1, 1), difficulty=0.3,
+                   seed=0, workers=None, vectorized=False, shard_size=SHARD_SIZE):
+    """Escribe un nivel de count obstáculos en path (.avlb o .json). density es obstáculos
+    por cada 1000 px de recorrido. Devuelve la cantidad de tramos generados."""
+    if len(lane_weights) != LANES or min(lane_weights) < 0 or not any(lane_weights):
+        raise ValueError(f"se esperan {LANES} pesos de carril no negativos")
+    if count < 1 or density <= 0:
+        raise ValueError("count y density deben ser positivos")
+    difficulty = min(1.0, max(0.0, difficulty))
+    fmt = "avlb" if path.endswith(".avlb") else "json"
+    config = level_config(count, density, vectorized)
+    plan = plan_shards(count, density, shard_size)
+    # Cada carril recibe su parte según el peso: el más cargado no puede pasar de MAX_FILL
+    total = sum(lane_weights)
+    lane, weight = max(enumerate(lane_weights), key=lambda item: item[1])
+    if any(n * weight / total > (x1 - x0) * MAX_FILL for x0, x1, n, _first_id in plan):
+        raise ValueError(f"densidad demasiado alta para el carril {lane} (peso {weight:g} de "
+                         f"{total:g}): el máximo es {int(1000 * MAX_FILL * total / weight)} "
+                         f"obstáculos cada 1000 px")
+
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(path))) as tmp_dir, \
+            ProcessPoolExecutor(max_workers=workers) as pool:
+        jobs = [(i, shard, tuple(lane_weights), difficulty, seed, fmt, tmp_dir)
+                for i, shard in enumerate(plan)]
+        # map entrega los tramos en orden; se escriben apenas llegan
+        results = pool.map(_shard_job, jobs)
+        with open(path, "wb") as out:
+            if fmt == "avlb":
+                config_bytes = json.dumps(config, ensure_ascii=False).encode("utf-8")
+                out.write(HEADER.pack(MAGIC, VERSION, len(OBSTACLE_TYPES), count, len(config_bytes)))
+                out.write(config_bytes)
+                for t in OBSTACLE_TYPES:
+                    out.write(TYPE.pack(_encode(t["name"], 32, "utf-8"), _encode(t["color"], 8, "ascii"),
+                                        _encode(t["text_color"], 8, "ascii"), ALL_TYPE_FIELDS))
+                offset = HEADER.size + len(config_bytes) + TYPE.size * len(OBSTACLE_TYPES)
+                out.write(b"\0" * (_align8(offset) - offset))
+                # Primero las columnas de todos los tramos (X, carril, x float), después los
+                # registros
+                lanes, records = [], []
+                for index_path, lanes_path, records_path in results:
+                    _append(out, index_path)
+                    lanes.append(lanes_path)
+                    records.append(records_path)
+                for lanes_path in lanes:
+                    _append(out, lanes_path)
+                # Las x generadas son enteras
+                out.write(b"\0" * count)
+                offset = _align8(offset) + 11 * count
+                out.write(b"\0" * (_align8(offset) - offset))
+                for records_path in records:
+                    _append(out, records_path)
+            else:
+                # "config" y "sorted" antes de "obstacles", como exige la carga por tramos
+                # (LevelStream)
+                out.write(b'{\n"config": ' + json.dumps(config, ensure_ascii=False).encode("utf-8")
+                          + b',\n"sorted": true,\n"obstacles": [\n')
+                for i, (shard_path, _lanes, _records) in enumerate(results):
+                    if i:
+                        out.write(b",\n")
+                    _append(out, shard_path)
+                out.write(b"\n]\n}\n")
+    return len(plan)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generar niveles procedurales grandes")
+    parser.add_argument("output", help="archivo de salida (.avlb o .json)")
+    parser.add_argument("--count", type=int, default=1_000_000, help="cantidad de obstáculos")
+    parser.add_argument("--density", type=float, default=20.0,
+                        help="obstáculos por cada 1000 px de recorrido")
+    parser.add_argument("--lanes", type=float, nargs=LANES, default=[1] * LANES, metavar="PESO",
+                        help="peso relativo de cada carril, de arriba hacia abajo")
+    parser.add_argument("--difficulty", type=float, default=0.3,
+                        help="0..1: tamaño de los obstáculos y frecuencia de paredes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, help="procesos (por defecto, uno por CPU)")
+    parser.add_argument("--vectorized", action="store_true",
+                        help='marcar el nivel con "vectorized" (colisiones con NumPy)')
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    try:
+        shards = generate_level(args.output, args.count, args.density, args.lanes, args.difficulty,
+                                args.seed, args.workers, args.vectorized)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"{args.count} obstáculos en {shards} tramos escritos en {args.output} "
+          f"({time.perf_counter() - t0:.1f} s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,37 @@
+import os
+
+from gui.binary_level import load_game_from_binary, open_binary_level_stream
+from gui.json_loader import UnsortedLevelError, load_game_from_json, open_level_stream
+from gui.persistent_avl import PersistentAVLTree
+
+# Niveles a partir de este tamaño se cargan por tramos a medida que avanza el carro (los JSON,
+# solo si declaran "sorted": true; ver json_loader.LevelStream)
+STREAMING_MIN_BYTES = 32 * 1024 * 1024
+
+
+def open_level(file_path: str, level_cache=None):
+    """Abre un nivel .json o .avlb como lo hace el juego. Devuelve (config, avl, stream);
+    stream es None salvo en niveles grandes y ordenados, que se cargan por tramos."""
+    stream = None
+    streaming = os.path.getsize(file_path) >= STREAMING_MIN_BYTES
+    if file_path.lower().endswith(".avlb"):
+        if streaming:
+            config, avl, stream = open_binary_level_stream(file_path)
+        else:
+            config, avl = load_game_from_binary(file_path)
+    else:
+        if streaming:
+            try:
+                config, avl, stream = open_level_stream(file_path)
+            except UnsortedLevelError:
+                # Sin orden garantizado, los tramos perderían obstáculos: se carga entero
+                stream = None
+        if stream is None:
+            if level_cache:
+                config, avl = level_cache.load(file_path)
+            else:
+                config, avl = load_game_from_json(file_path)
+    if stream is None and not isinstance(avl, PersistentAVLTree):
+        # Árbol persistente: la simulación guarda un checkpoint por segundo para retroceder
+        avl = PersistentAVLTree.from_tree(avl)
+    return config, avl, stream
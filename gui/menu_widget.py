@@ -67,7 +67,7 @@ class MenuWidget(QWidget):
             self,
             "Seleccionar Nivel JSON",
             "",
-            "JSON Files (*.json);;All Files (*)"
+            "Niveles (*.json *.avlb);;JSON Files (*.json);;Niveles binarios (*.avlb);;All Files (*)"
         )
         if file_path:
             self.load_level_signal.emit(file_path)
@@ -0,0 +1,120 @@
+"""Almacén de obstáculos activos en arreglos paralelos de NumPy (opcional).
+
+Alternativa a LaneIndex para niveles con miles de obstáculos activos a la vez: x, carril,
+ancho, alto y si ya fue golpeado viven en arreglos, la colisión con el carro es una sola
+prueba de solapamiento vectorizada y los obstáculos ya pasados se descartan con una máscara. Se activa
+con "vectorized": true en config.game; sin NumPy el juego usa LaneIndex.
+"""
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional
+    np = None
+
+HAVE_NUMPY = np is not None
+
+
+class ObstacleArrays:
+    """Misma interfaz que LaneIndex (add, discard, clear, query) más collide y ahead.
+
+    Cada obstáculo ocupa una posición de los arreglos; al quitarlo, el último pasa a su lugar,
+    así add y discard son O(1) amortizado. query y ahead son O(n) en NumPy, sin bucles de
+    Python por obstáculo."""
+
+    def __init__(self, lane_y, capacity=256):
+        if np is None:
+            raise ImportError("ObstacleArrays requiere NumPy")
+        self.lane_y = lane_y
+        self._lane_base = np.asarray(lane_y, dtype=np.int64)
+        self._n = 0
+        self._seq = 0
+        # id(obstáculo) -> posición en los arreglos
+        self._slots = {}
+        self._alloc(capacity)
+
+    def _alloc(self, capacity):
+        n = self._n
+        old = getattr(self, "objs", None)
+        arrays = {
+            # x_world puede ser float (niveles .json y .avlb): como en LaneIndex, sin truncar
+            "x": np.float64, "lane": np.int64, "width": np.int64, "height": np.int64,
+            "hit": np.bool_, "seq": np.int64, "objs": object,
+        }
+        for name, dtype in arrays.items():
+            grown = np.empty(capacity, dtype=dtype)
+            if old is not None:
+                grown[:n] = getattr(self, name)[:n]
+            setattr(self, name, grown)
+
+    def __contains__(self, ob):
+        return id(ob) in self._slots
+
+    def __len__(self):
+        return self._n
+
+    def add(self, ob):
+        if id(ob) in self._slots:
+            return
+        i = self._n
+        if i == len(self.x):
+            self._alloc(2 * len(self.x))
+        self.x[i] = ob["x_world"]
+        self.lane[i] = ob["lane_idx"]
+        self.width[i] = ob["width"]
+        self.height[i] = ob["height"]
+        self.hit[i] = bool(ob.get("hit", False))
+        self._seq += 1
+        self.seq[i] = self._seq
+        self.objs[i] = ob
+        self._slots[id(ob)] = i
+        self._n += 1
+
+    def discard(self, ob):
+        i = self._slots.pop(id(ob), None)
+        if i is None:
+            return
+        last = self._n - 1
+        if i != last:
+            for arr in (self.x, self.lane, self.width, self.height, self.hit, self.seq, self.objs):
+                arr[i] = arr[last]
+            self._slots[id(self.objs[i])] = i
+        self.objs[last] = None
+        self._n = last
+
+    def clear(self):
+        self.objs[:self._n] = None
+        self._n = 0
+        self._slots = {}
+
+    def query(self, x, y, w, h):
+        """Obstáculos cuyo rectángulo toca (x, y, w, h) en coordenadas de mundo, con la misma
+        prueba inclusiva que GameSimulation.check_collision y en el orden de LaneIndex
+        (carril, x, orden de llegada)."""
+        return self.objs[self._touching(x, y, w, h)].tolist()
+
+    def collide(self, x, y, w, h):
+        """Como query, pero marca los obstáculos tocados en la máscara hit. Devuelve pares
+        (obstáculo, golpe nuevo): golpe nuevo es False si ya estaba golpeado."""
+        found = self._touching(x, y, w, h)
+        new = ~self.hit[found]
+        self.hit[found] = True
+        return list(zip(self.objs[found].tolist(), new.tolist()))
+
+    def _touching(self, x, y, w, h):
+        n = self._n
+        xs, widths, heights, lanes = self.x[:n], self.width[:n], self.height[:n], self.lane[:n]
+        top = self._lane_base[lanes] - heights
+        overlap = ~((x + w < xs) | (x > xs + widths) | (y + h < top) | (y > top + heights))
+        found = np.flatnonzero(overlap)
+        if len(found) > 1:
+            found = found[np.lexsort((self.seq[found], xs[found], lanes[found]))]
+        return found
+
+    def ahead(self, min_x, exclude=()):
+        """Obstáculos cuyo borde derecho pasa de min_x (los demás ya quedaron atrás), salvo
+        los de exclude (ids de objeto)."""
+        n = self._n
+        keep = self.x[:n] + self.width[:n] > min_x
+        if exclude:
+            slots = self._slots
+            keep[[slots[key] for key in exclude if key in slots]] = False
+        return self.objs[:n][keep].tolist()
@@ -0,0 +1,11 @@
+# Tipos de obstáculos que se pueden agregar en caliente (botón "Agregar Obstáculo")
+OBSTACLE_TYPES = [
+    {"name": "Aceite", "color": "#2C3E50", "text_color": "#ECF0F1"},
+    {"name": "Hueco", "color": "#8B4513", "text_color": "#FFFFFF"},
+    {"name": "Cono", "color": "#E67E22", "text_color": "#FFFFFF"},
+    {"name": "Piedra", "color": "#95A5A6", "text_color": "#2C3E50"},
+    {"name": "Charco", "color": "#3498DB", "text_color": "#FFFFFF"},
+    {"name": "Rama", "color": "#27AE60", "text_color": "#FFFFFF"},
+    {"name": "Vidrio", "color": "#E8F8F5", "text_color": "#2C3E50"},
+    {"name": "Metal", "color": "#566573", "text_color": "#FFFFFF"}
+]
@@ -0,0 +1,129 @@
+"""Instrumentación de rendimiento por tick.
+
+PerfMonitor mide cuánto tarda cada fase de GameSimulation.step() y de los paintEvent, junto con
+los contadores de AVLTree (rotaciones, inserciones, eliminaciones y desalojos), y guarda una
+traza con una fila por tick exportable a CSV o JSON. Desactivado (sim.perf = None y el árbol
+sin contadores) el costo es una comparación con None por fase.
+
+En el juego, F3 muestra u oculta el HUD con p50/p99 y F4 exporta la traza. Sin pantalla:
+
+    python -m gui.replay partida.avlr --trace traza.csv
+"""
+import csv
+import json
+import time
+from collections import deque
+
+# Fases de GameSimulation.step() en el orden en que ocurren
+TICK_PHASES = ("inputs", "stream", "evict", "activate", "collide", "finish")
+# Fases medidas fuera de step(): se anotan en la fila del último tick
+PAINT_PHASES = ("paint_game", "paint_tree")
+COUNTERS = ("rotations", "inserts", "deletes", "evictions")
+
+
+def percentile(ordered, q):
+    """Percentil q (0..1) de una secuencia ya ordenada, por rango más cercano."""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class PerfMonitor:
+    """Tiempos por fase y contadores del árbol. window es la cantidad de ticks de las
+    ventanas móviles de p50/p99; max_trace limita la traza exportable."""
+
+    def __init__(self, window=600, max_trace=100_000):
+        self.samples = {phase: deque(maxlen=window) for phase in ("tick",) + TICK_PHASES + PAINT_PHASES}
+        self.trace = deque(maxlen=max_trace)
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self._row = None
+        self._start = 0.0
+        self._last = 0.0
+        self._counters_before = None
+        # Árbol del nivel cuyos contadores están conectados a este monitor
+        self.tree = None
+
+    # ---------- activación ----------
+    def enable(self, tree):
+        """Conecta los contadores de tree (el árbol del nivel) a este monitor. Los demás árboles,
+        como los de LaneIndex, no cuentan."""
+        self.disable()
+        self.tree = tree
+        if tree is not None:
+            tree.counters = self.counters
+
+    def disable(self):
+        tree, self.tree = self.tree, None
+        if tree is not None and tree.counters is self.counters:
+            tree.counters = None
+
+    # ---------- medición ----------
+    def begin_tick(self, frame):
+        self._row = {"frame": frame}
+        self._counters_before = dict(self.counters)
+        self._start = self._last = time.perf_counter()
+
+    def mark(self, phase):
+        """Cierra la fase phase: le asigna el tiempo desde la marca anterior."""
+        now = time.perf_counter()
+        self._row[phase] = self._row.get(phase, 0.0) + now - self._last
+        self._last = now
+
+    def end_tick(self):
+        row = self._row
+        row["tick"] = self._last - self._start
+        for phase in ("tick",) + TICK_PHASES:
+            self.samples[phase].append(row.get(phase, 0.0))
+        before = self._counters_before
+        for name, value in self.counters.items():
+            row[name] = value - before[name]
+        self.trace.append(row)
+        self._row = None
+
+    def record(self, phase, seconds):
+        """Tiempo medido fuera de step() (p. ej. un paintEvent), sumado a la fila del último tick."""
+        self.samples[phase].append(seconds)
+        if self.trace:
+            row = self.trace[-1]
+            row[phase] = row.get(phase, 0.0) + seconds
+
+    # ---------- resultados ----------
+    def percentiles(self, phase):
+        """(p50, p99) en segundos de la ventana móvil de phase."""
+        ordered = sorted(self.samples[phase])
+        return percentile(ordered, 0.5), percentile(ordered, 0.99)
+
+    def summary_lines(self):
+        """Líneas de texto del HUD: p50/p99 por fase en ms y contadores acumulados."""
+        lines = []
+        for phase, samples in self.samples.items():
+            if samples:
+                p50, p99 = self.percentiles(phase)
+                lines.append(f"{phase:<10} {p50 * 1000:7.3f} {p99 * 1000:7.3f} ms")
+        c = self.counters
+        lines.append(f"nivel: rot {c['rotations']}  ins {c['inserts']}  del {c['deletes']}  "
+                     f"desaloj {c['evictions']}")
+        return lines
+
+    def fields(self):
+        return ["frame", "tick", *TICK_PHASES, *PAINT_PHASES, *COUNTERS]
+
+    def export(self, path):
+        """Escribe la traza por tick en CSV o JSON según la extensión de path (tiempos en ms)."""
+        fields = self.fields()
+        rows = []
+        for row in self.trace:
+            out = {}
+            for name in fields:
+                value = row.get(name, 0)
+                out[name] = round(value * 1000, 6) if isinstance(value, float) else value
+            rows.append(out)
+        if path.endswith(".json"):
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"unit": "ms", "ticks": rows}, f)
+        else:
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=fields)
+                writer.writeheader()
+                writer.writerows(rows)
+        return len(rows)
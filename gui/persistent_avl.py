@@ -0,0 +1,158 @@
+from gui.avl_tree import AVLNode, AVLTree, EVENT_DELETED, EVENT_INSERTED, EVENT_ROTATED
+
+
+class PersistentAVLTree(AVLTree):
+    """AVLTree persistente por copia de camino (path copying).
+
+    Ningún nodo se modifica después de creado: insert, delete, split, join y
+    remove_passed_obstacles construyen nodos nuevos solo a lo largo del camino afectado y
+    comparten el resto con la versión anterior. Cada versión cuesta O(log n) de memoria
+    extra, snapshot() y restore() son O(1) y una instantánea nunca cambia aunque el árbol
+    siga mutando. Las consultas y recorridos son los de AVLTree."""
+
+    @classmethod
+    def from_tree(cls, tree):
+        """Toma posesión de los nodos de tree en O(1); tree queda vacío para que nadie
+        los modifique en el lugar."""
+        persistent = cls()
+        persistent.root = tree.root
+        tree.root = None
+        tree.notify_reset()
+        return persistent
+
+    def snapshot(self):
+        """Versión actual como árbol de solo lectura, en O(1)."""
+        frozen = type(self)()
+        frozen.root = self.root
+        return frozen
+
+    def restore(self, snapshot):
+        """Vuelve a la versión guardada por snapshot(), en O(1)."""
+        self.root = snapshot.root
+        self.notify_reset()
+
+    def copy(self):
+        return self.snapshot()
+
+    # ---------- construcción de nodos ----------
+    def _node(self, key, obstacle, left, right):
+        node = AVLNode(key, obstacle)
+        node.left = left
+        node.right = right
+        self.update_height(node)
+        return node
+
+    def _balance(self, key, obstacle, left, right):
+        """Nodo nuevo (key, obstacle, left, right) con las rotaciones necesarias, sin tocar
+        los nodos existentes: los que cambian de hijos se recrean."""
+        hl, hr = self.get_height(left), self.get_height(right)
+        if hl > hr + 1:
+            if self.get_height(left.left) >= self.get_height(left.right):
+                # Izquierda-Izquierda
+                self._rotated(key, 1)
+                return self._node(left.key, left.obstacle, left.left,
+                                  self._node(key, obstacle, left.right, right))
+            # Izquierda-Derecha
+            self._rotated(key, 2)
+            mid = left.right
+            return self._node(mid.key, mid.obstacle,
+                              self._node(left.key, left.obstacle, left.left, mid.left),
+                              self._node(key, obstacle, mid.right, right))
+        if hr > hl + 1:
+            if self.get_height(right.right) >= self.get_height(right.left):
+                # Derecha-Derecha
+                self._rotated(key, 1)
+                return self._node(right.key, right.obstacle,
+                                  self._node(key, obstacle, left, right.left), right.right)
+            # Derecha-Izquierda
+            self._rotated(key, 2)
+            mid = right.left
+            return self._node(mid.key, mid.obstacle,
+                              self._node(key, obstacle, left, mid.left),
+                              self._node(right.key, right.obstacle, mid.right, right.right))
+        return self._node(key, obstacle, left, right)
+
+    def _rotated(self, key, n):
+        # Las mismas que harían rotate_left/rotate_right en AVLTree (simple 1, doble 2)
+        if self.counters is not None:
+            self.counters["rotations"] += n
+        if self._listeners:
+            self._emit(EVENT_ROTATED, key, n)
+
+    # ---------- inserción / eliminación ----------
+    def insert(self, key, obstacle):
+        root = self._insert(self.root, key, obstacle)
+        if root is not self.root:
+            self.root = root
+            self.version += 1
+            if self.counters is not None:
+                self.counters["inserts"] += 1
+            if self._listeners:
+                self._emit(EVENT_INSERTED, key)
+
+    def _insert(self, node, key, obstacle):
+        if not node:
+            return AVLNode(key, obstacle)
+        if key < node.key:
+            left = self._insert(node.left, key, obstacle)
+            if left is node.left:
+                return node
+            return self._balance(node.key, node.obstacle, left, node.right)
+        if key > node.key:
+            right = self._insert(node.right, key, obstacle)
+            if right is node.right:
+                return node
+            return self._balance(node.key, node.obstacle, node.left, right)
+        # Clave repetida: se conserva la existente y la versión no cambia
+        return node
+
+    def delete(self, key):
+        root = self._delete(self.root, key)
+        if root is not self.root:
+            self.root = root
+            self.version += 1
+            if self.counters is not None:
+                self.counters["deletes"] += 1
+            if self._listeners:
+                self._emit(EVENT_DELETED, key)
+
+    def _delete(self, node, key):
+        if not node:
+            return None
+        if key < node.key:
+            left = self._delete(node.left, key)
+            if left is node.left:
+                return node
+            return self._balance(node.key, node.obstacle, left, node.right)
+        if key > node.key:
+            right = self._delete(node.right, key)
+            if right is node.right:
+                return node
+            return self._balance(node.key, node.obstacle, node.left, right)
+        if not node.left:
+            return node.right
+        if not node.right:
+            return node.left
+        succ, right = self._pop_min(node.right)
+        return self._balance(succ.key, succ.obstacle, node.left, right)
+
+    def _pop_min(self, node):
+        """Devuelve (nodo mínimo, nueva raíz sin él). El nodo mínimo no se modifica: solo se
+        usan su clave y su obstáculo."""
+        if not node.left:
+            return node, node.right
+        minimum, left = self._pop_min(node.left)
+        return minimum, self._balance(node.key, node.obstacle, left, node.right)
+
+    # ---------- split / join ----------
+    # split, join y remove_passed_obstacles de AVLTree solo leen los nodos y delegan la
+    # construcción en _join/_pop_min, así que con estas versiones ya no mutan nada.
+    def _join(self, left, node, right):
+        hl, hr = self.get_height(left), self.get_height(right)
+        if hl > hr + 1:
+            return self._balance(left.key, left.obstacle, left.left,
+                                 self._join(left.right, node, right))
+        if hr > hl + 1:
+            return self._balance(right.key, right.obstacle,
+                                 self._join(left, node, right.left), right.right)
+        return self._node(node.key, node.obstacle, left, right)
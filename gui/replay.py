@@ -0,0 +1,171 @@
+"""Grabación de partidas y repetición determinista.
+
+Una partida queda determinada por el nivel, la semilla de GameSimulation y las acciones que
+recibe cada llamada a step(). El archivo de grabación (.avlr) guarda solo eso (little-endian):
+
+    cabecera  "<4sHQ16sH"  magia b"AVLR", versión, semilla, hash del nivel, largo de la ruta
+    ruta      ruta del nivel en UTF-8
+    eventos   "<IBi" por acción: frame (número de step()), código de acción, argumento
+    fin       evento con código 0 y el frame final, seguido de GameSimulation.state_digest()
+
+Repetir sin pantalla, a máxima velocidad, y comprobar que el final coincide:
+
+    python -m gui.replay partida.avlr
+
+Con --trace traza.csv (o .json) además se mide cada fase de los ticks (ver gui/perf.py).
+
+En pantalla, a N veces la velocidad normal: python main.py --replay partida.avlr --replay-speed 4
+"""
+import argparse
+import struct
+import sys
+import time
+
+from gui.level_cache import file_digest
+from gui.levels import open_level
+from gui.perf import PerfMonitor
+from gui.simulation import (GameSimulation, ACTION_UP, ACTION_DOWN, ACTION_JUMP, ACTION_START,
+                            ACTION_ADD_OBSTACLE, ACTION_REWIND, ACTION_VIEW_WIDTH)
+
+MAGIC = b"AVLR"
+VERSION = 2
+HEADER = struct.Struct("<4sHQ16sH")
+EVENT = struct.Struct("<IBi")
+DIGEST_SIZE = 16
+
+CODE_END = 0
+ACTION_CODES = {
+    ACTION_UP: 1,
+    ACTION_DOWN: 2,
+    ACTION_JUMP: 3,
+    ACTION_START: 4,
+    ACTION_ADD_OBSTACLE: 5,
+    ACTION_REWIND: 6,
+    ACTION_VIEW_WIDTH: 7,
+}
+CODE_ACTIONS = {code: action for action, code in ACTION_CODES.items()}
+
+
+class InputRecorder:
+    """Graba las acciones de cada step() de una simulación. Se conecta con sim.recorder."""
+
+    def __init__(self, path: str, level_path: str, seed: int):
+        self.path = path
+        self._file = open(path, "wb")
+        raw_path = level_path.encode("utf-8")
+        self._file.write(HEADER.pack(MAGIC, VERSION, seed, file_digest(level_path), len(raw_path)))
+        self._file.write(raw_path)
+
+    def record(self, frame, inputs):
+        for action in inputs:
+            if isinstance(action, tuple):
+                name, value = action
+                self._file.write(EVENT.pack(frame, ACTION_CODES[name], value))
+            else:
+                self._file.write(EVENT.pack(frame, ACTION_CODES[action], 0))
+
+    def close(self, sim):
+        """Cierra la grabación anotando el frame final y el resumen del estado de sim."""
+        if self._file.closed:
+            return
+        self._file.write(EVENT.pack(sim.frame, CODE_END, 0))
+        self._file.write(sim.state_digest())
+        self._file.close()
+
+
+class Recording:
+    """Grabación leída de disco: acciones agrupadas por frame."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, self.seed, self.level_digest, path_len = HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} no es una grabación (.avlr)")
+        if version != VERSION:
+            raise ValueError(f"Versión de grabación no soportada: {version}")
+        offset = HEADER.size
+        self.level_path = data[offset:offset + path_len].decode("utf-8")
+        offset += path_len
+        self.events = {}
+        # Una grabación cortada (el juego se cerró de golpe) no tiene evento final
+        self.end_frame = 0
+        self.final_digest = None
+        while offset + EVENT.size <= len(data):
+            frame, code, value = EVENT.unpack_from(data, offset)
+            offset += EVENT.size
+            if code == CODE_END:
+                self.end_frame = frame
+                self.final_digest = data[offset:offset + DIGEST_SIZE]
+                break
+            action = CODE_ACTIONS[code]
+            self.events.setdefault(frame, []).append(
+                (action, value) if action == ACTION_VIEW_WIDTH else action)
+            self.end_frame = max(self.end_frame, frame)
+
+    def inputs(self, frame):
+        return self.events.get(frame, ())
+
+    def check_level(self, level_path=None):
+        """True si el archivo de nivel es el mismo con el que se grabó."""
+        return file_digest(level_path or self.level_path) == self.level_digest
+
+
+def replay_headless(recording, level_path=None, perf=None):
+    """Repite la grabación sin pantalla y tan rápido como se pueda.
+    Devuelve (sim, segundos por frame) para diagnosticar picos de tiempo por tick.
+    Con perf (perf.PerfMonitor) además se mide cada fase de los ticks."""
+    config, avl, stream = open_level(level_path or recording.level_path)
+    sim = GameSimulation(avl, config, seed=recording.seed)
+    sim.level_stream = stream
+    sim.perf = perf
+    if perf:
+        perf.enable(avl)
+    timings = []
+    while sim.frame < recording.end_frame:
+        t0 = time.perf_counter()
+        sim.step(recording.inputs(sim.frame + 1))
+        timings.append(time.perf_counter() - t0)
+    if stream:
+        stream.close()
+    return sim, timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Repetir una partida grabada sin pantalla")
+    parser.add_argument("recording", help="archivo .avlr")
+    parser.add_argument("--level", help="nivel a usar en lugar de la ruta guardada en la grabación")
+    parser.add_argument("--slowest", type=int, default=5, help="cuántos frames más lentos listar")
+    parser.add_argument("--trace", metavar="ARCHIVO",
+                        help="medir cada fase de los ticks y exportar la traza (.csv o .json)")
+    args = parser.parse_args(argv)
+
+    recording = Recording(args.recording)
+    if not recording.check_level(args.level):
+        print("Advertencia: el nivel cambió desde la grabación", file=sys.stderr)
+    perf = None
+    if args.trace:
+        perf = PerfMonitor(window=recording.end_frame or 1, max_trace=recording.end_frame or 1)
+    sim, timings = replay_headless(recording, args.level, perf)
+    if perf:
+        perf.disable()
+        print("fase           p50     p99")
+        for line in perf.summary_lines():
+            print(f"  {line}")
+        print(f"Traza de {perf.export(args.trace)} ticks en {args.trace}")
+    print(f"{sim.frame} frames en {sum(timings):.3f} s; resultado: {sim.result}")
+    slowest = sorted(range(len(timings)), key=timings.__getitem__, reverse=True)[:args.slowest]
+    for i in slowest:
+        print(f"  frame {i + 1}: {timings[i] * 1000:.3f} ms")
+    if recording.final_digest is None:
+        print("La grabación no tiene estado final (incompleta); no se puede verificar")
+        return 0
+    if sim.state_digest() != recording.final_digest:
+        print("La repetición NO coincide con la partida grabada")
+        return 1
+    print("La repetición coincide con la partida grabada")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,522 @@
+import hashlib
+import math
+import random
+from collections import deque
+from gui.avl_tree import EVENT_DELETED, EVENT_INSERTED, EVENT_RANGE_EVICTED, EVENT_RESET
+from gui.obstacle_arrays import HAVE_NUMPY, ObstacleArrays
+from gui.obstacle_types import OBSTACLE_TYPES
+from gui.spatial_index import LaneIndex
+from gui.spawn_scheduler import SpawnScheduler
+
+# Acciones que acepta GameSimulation.step(). Todo lo que cambia la partida desde afuera
+# entra como acción, así una grabación de las acciones por tick reproduce la partida exacta.
+ACTION_UP = "up"
+ACTION_DOWN = "down"
+ACTION_JUMP = "jump"
+ACTION_START = "start"
+ACTION_ADD_OBSTACLE = "add_obstacle"
+ACTION_REWIND = "rewind"
+# Acción con argumento: (ACTION_VIEW_WIDTH, ancho)
+ACTION_VIEW_WIDTH = "view_width"
+
+MSG_LOST = "Que mal, perdiste! No te quedan vidas."
+MSG_WON = "Felicidades, ganaste! Llegaste a la meta."
+
+# Duración de un tick si el nivel no define config.game.refresh_ms
+DEFAULT_REFRESH_MS = 30
+
+
+class _TreeSpawn(dict):
+    """Obstáculo que add_random_obstacle inserta en el árbol solo para verlo en TreeWidget: en
+    la partida entra por GameSimulation.spawns. Se lo reconoce por el tipo y no por "id", que
+    puede coincidir con el de un obstáculo del nivel."""
+    __slots__ = ()
+
+
+class GameSimulation:
+    """Motor del juego sin dependencias de Qt.
+
+    Es dueño del desplazamiento del mundo, el salto, las vidas, los spawns y el árbol AVL.
+    Cada llamada a step() avanza un tick; GameWidget solo lo dibuja, pero también puede
+    ejecutarse sin pantalla (benchmarks, pruebas, ajuste de niveles) tan rápido como se quiera.
+    """
+
+    def __init__(self, avl_tree, config: dict = None, view_width=800, seed=None):
+        self.avl_tree = None
+        self.config = config or {}
+        game_cfg = self.config.get("game", {})
+        self.speed = game_cfg.get("speed", 6)
+        # Paso fijo de la simulación: GameWidget ejecuta un step() cada refresh_ms de reloj
+        self.refresh_ms = game_cfg.get("refresh_ms", DEFAULT_REFRESH_MS)
+        self.world_offset = 0
+        # Control de ejecucion: hasta que no se "start()" el juego no avanza
+        self.running = False
+        # Ancho visible del mundo (lo actualiza el widget al redimensionarse)
+        self.view_width = view_width
+        # Spawns de obstáculos registrados en caliente (botón "Agregar Obstáculo"), pendientes o
+        # activos hasta que quedan atrás
+        self.spawns = SpawnScheduler()
+        # Copias activas de los obstáculos del árbol dentro de la ventana visible, por clave AVL
+        self._active = {}
+        # Ventana (x_lo, x_hi) con la que se armó _active, o None si hay que rearmarla entera
+        # porque el árbol cambió dentro de ella (ver _on_tree_events)
+        self._window = None
+        # Umbral del último desalojo del árbol aún no reflejado en _active
+        self._evicted_below = float("-inf")
+        # Distancia extra a la derecha del viewport en la que ya se activan obstáculos
+        self.spawn_lookahead = 500
+        # Carga por tramos opcional (json_loader.LevelStream) que alimenta avl_tree al avanzar
+        self.level_stream = None
+
+        # Aleatoriedad de la partida: un generador por propósito derivado de la semilla, para que
+        # la misma semilla y las mismas acciones den la misma partida
+        self.seed = seed if seed is not None else random.SystemRandom().getrandbits(64)
+        self.rng_ids = random.Random(f"{self.seed}:ids")
+        self.rng_spawn = random.Random(f"{self.seed}:spawn")
+        # Llamadas a step() (a diferencia de tick, no retrocede con rewind) y grabador opcional
+        self.frame = 0
+        self.recorder = None
+        # Instrumentación opcional (perf.PerfMonitor): tiempos por fase de cada step()
+        self.perf = None
+
+        # Carro
+        self.car_x = 80
+        self.car_lane = 1
+        self.lane_y = [120, 200, 280, 360]
+        self.car_w, self.car_h = 100, 40
+
+        # Ruedas
+        self.wheel_r = 13
+        self.wheel_angle = 0.0
+
+        # Salto
+        self.jumping = False
+        self.jump_height = 70
+        self.jump_progress = 0
+        self.jump_max = 35
+
+        # Obstáculos
+        self.obstacles = []
+        # Índice por carril de los obstáculos activos (colisiones sin recorrer self.obstacles);
+        # con "vectorized" en config.game, arreglos de NumPy (ver use_vectorized)
+        self.lane_index = LaneIndex(self.lane_y)
+        self.vectorized = False
+        self.use_vectorized(game_cfg.get("vectorized", False))
+        self.lives = 1.0
+
+        # Animación de líneas de carretera
+        self.road_line_offset = 0
+
+        # Meta
+        self.goal_x = game_cfg.get("distance_total", 10000)
+
+        # Contador de ticks y mensaje final (None mientras la partida sigue)
+        self.tick = 0
+        self.result = None
+
+        # Checkpoints por segundo de juego para retroceder o reiniciar desde ahí. Solo se toman
+        # si el árbol admite snapshot() en O(1) (PersistentAVLTree) y no hay carga por tramos
+        self.checkpoints = deque(maxlen=120)
+
+        # Callbacks de eventos: on_hit(obstáculo) y on_game_over(mensaje)
+        self.on_hit = None
+        self.on_game_over = None
+
+        self.set_tree(avl_tree)
+
+    def set_tree(self, avl):
+        """Cambia el árbol fuente y fuerza la regeneración de los spawns."""
+        if self.avl_tree is not None:
+            self.avl_tree.unsubscribe(self._on_tree_events)
+        self.avl_tree = avl
+        if self.perf:
+            self.perf.enable(avl)
+        if avl is not None:
+            # Inmediato: los cambios del tick deben verse antes de activar obstáculos
+            avl.subscribe(self._on_tree_events, batched=False)
+        self._active = {}
+        self._window = None
+        self.lane_index.clear()
+
+    def _on_tree_events(self, events):
+        """Invalida la ventana activa solo si el árbol cambió dentro de ella. Las rotaciones no
+        cambian el contenido y los desalojos se recuerdan para compararlos con la ventana."""
+        for event in events:
+            kind = event.kind
+            if kind == EVENT_RANGE_EVICTED:
+                self._evicted_below = max(self._evicted_below, event.key[0])
+            elif kind == EVENT_RESET:
+                self._window = None
+            elif kind in (EVENT_INSERTED, EVENT_DELETED):
+                if self._window is not None and event.key[0] < self._window[1]:
+                    self._window = None
+
+    def use_vectorized(self, enabled):
+        """Cambia el índice de colisiones entre LaneIndex y ObstacleArrays (NumPy) conservando
+        los obstáculos activos. Sin NumPy se queda con LaneIndex y devuelve False."""
+        enabled = bool(enabled) and HAVE_NUMPY
+        if enabled != self.vectorized:
+            index = ObstacleArrays(self.lane_y) if enabled else LaneIndex(self.lane_y)
+            for ob in self._active.values():
+                index.add(ob)
+            for ob in self.spawns.active.values():
+                index.add(ob)
+            self.lane_index = index
+            self.vectorized = enabled
+        return enabled
+
+    def set_obstacles(self, obs: list):
+        """Establece la lista de obstáculos visibles en el juego"""
+        self.obstacles = [
+            {**o, "spawn_x": o.get("spawn_x", o.get("x_world", 0))}
+            for o in obs
+        ]
+
+    def apply_input(self, action):
+        if isinstance(action, tuple):
+            name, value = action
+            if name == ACTION_VIEW_WIDTH:
+                self.view_width = value
+        elif action == ACTION_START:
+            self.running = True
+        elif action == ACTION_ADD_OBSTACLE:
+            self.add_random_obstacle()
+        elif action == ACTION_REWIND:
+            self.rewind(3)
+        elif action == ACTION_UP and self.car_lane > 0:
+            self.car_lane -= 1
+        elif action == ACTION_DOWN and self.car_lane < len(self.lane_y)-1:
+            self.car_lane += 1
+        elif action == ACTION_JUMP and not self.jumping:
+            self.jumping = True
+            self.jump_progress = 0
+
+    def step(self, inputs=()):
+        """Avanza un tick aplicando antes las acciones de inputs. Devuelve self.result."""
+        if not self.avl_tree:
+            return self._step(inputs)
+        # Los suscriptores agrupados del árbol (TreeWidget) reciben un solo aviso por tick
+        with self.avl_tree.batch():
+            return self._step(inputs)
+
+    def _step(self, inputs):
+        self.frame += 1
+        perf = self.perf
+        if perf:
+            perf.begin_tick(self.frame)
+        if self.recorder:
+            self.recorder.record(self.frame, inputs)
+        for action in inputs:
+            self.apply_input(action)
+        self.tick += 1
+
+        # Avanzar sólo si el juego está en ejecución (presionaron "Jugar")
+        if self.running:
+            self.world_offset += self.speed
+        self.road_line_offset = self.world_offset % 40
+        if perf:
+            perf.mark("inputs")
+
+        # Traer el siguiente tramo del nivel si se carga por streaming
+        if self.level_stream:
+            self.level_stream.advance(self.world_offset)
+        if perf:
+            perf.mark("stream")
+
+        # Eliminar obstáculos que ya pasaron
+        car_world_x = self.world_offset + self.car_x
+        if self.avl_tree:
+            self.avl_tree.remove_passed_obstacles(car_world_x)
+        if perf:
+            perf.mark("evict")
+
+        # Sólo se consideran los obstáculos visibles o a punto de entrar por la derecha
+        window_lo = car_world_x - 100
+        window_hi = self.world_offset + max(self.view_width, 800) + self.spawn_lookahead
+        self._activate_from_avl(window_lo, window_hi)
+        self.obstacles = list(self._active.values())
+        activated, retired = self.spawns.advance(window_lo, window_hi)
+        for ob in retired:
+            self.lane_index.discard(ob)
+        for ob in activated:
+            self.lane_index.add(ob)
+        self.obstacles.extend(self.spawns.active.values())
+        if perf:
+            perf.mark("activate")
+
+        # Salto
+        if self.jumping:
+            self.jump_progress += 1
+            if self.jump_progress >= self.jump_max:
+                self.jumping = False
+                self.jump_progress = 0
+
+        # Rotación ruedas
+        circ = 2 * math.pi * self.wheel_r
+        if circ > 0:
+            self.wheel_angle = (self.wheel_angle + (self.speed / circ) * 360) % 360
+
+        # Colisiones: el índice por carril solo devuelve obstáculos cerca del carro
+        collided = set()
+        if not self.jumping:
+            car_rect = (car_world_x, self.car_y() - self.car_h,
+                        self.car_w, self.car_h)
+            if self.vectorized:
+                # La prueba exacta ya la hace collide(), que además lleva la máscara de golpeados
+                touched = self.lane_index.collide(*car_rect)
+            else:
+                touched = self._touched(car_rect)
+            for ob, new_hit in touched:
+                if self.on_hit:
+                    self.on_hit(ob)
+
+                if new_hit:
+                    self.lives -= 0.15
+                    self.lives = max(0.0, self.lives)
+                    ob["hit"] = True # marcar como golpeado para no descontar más vidas
+                # eliminar obstáculo golpeado (de la lista de este tick)
+                collided.add(id(ob))
+
+        # Eliminar obstáculos ya pasados y los golpeados
+        if self.vectorized:
+            self.obstacles = self.lane_index.ahead(self.world_offset + self.car_x, collided)
+        else:
+            self.obstacles = [
+                ob for ob in self.obstacles
+                if ob["x_world"] - self.world_offset + ob["width"] > self.car_x
+                and id(ob) not in collided
+            ]
+        if perf:
+            perf.mark("collide")
+
+        # Revisar fin de juego
+        if self.lives <= 0:
+            self._finish(MSG_LOST)
+        elif self.world_offset >= self.goal_x:
+            self._finish(MSG_WON)
+        elif self.tick % self.checkpoint_every == 0 and self.can_checkpoint():
+            self.checkpoints.append(self.checkpoint())
+        if perf:
+            perf.mark("finish")
+            perf.end_tick()
+        return self.result
+
+    def _finish(self, msg):
+        self.result = msg
+        if self.on_game_over:
+            self.on_game_over(msg)
+
+    # ---------- checkpoints ----------
+    @property
+    def checkpoint_every(self):
+        """Ticks por segundo de juego."""
+        return max(1, round(1000 / self.refresh_ms))
+
+    def can_checkpoint(self):
+        return hasattr(self.avl_tree, "snapshot") and not self.level_stream
+
+    def checkpoint(self):
+        """Estado completo de la partida. El árbol se guarda con snapshot() (O(1), comparte
+        estructura); los obstáculos activos se copian porque su estado ("hit") cambia."""
+        active, spawns, obstacles = self._copy_obstacles(self._active, self.spawns, self.obstacles)
+        return {
+            "tick": self.tick,
+            "tree": self.avl_tree.snapshot(),
+            "world_offset": self.world_offset,
+            "lives": self.lives,
+            "car_lane": self.car_lane,
+            "jumping": self.jumping,
+            "jump_progress": self.jump_progress,
+            "wheel_angle": self.wheel_angle,
+            "active": active,
+            "spawns": spawns,
+            "obstacles": obstacles,
+        }
+
+    def restore_checkpoint(self, cp):
+        """Vuelve al estado de checkpoint(). Se puede restaurar el mismo checkpoint varias veces."""
+        self.avl_tree.restore(cp["tree"])
+        self.tick = cp["tick"]
+        self.world_offset = cp["world_offset"]
+        self.road_line_offset = self.world_offset % 40
+        self.lives = cp["lives"]
+        self.car_lane = cp["car_lane"]
+        self.jumping = cp["jumping"]
+        self.jump_progress = cp["jump_progress"]
+        self.wheel_angle = cp["wheel_angle"]
+        self._active, self.spawns, self.obstacles = self._copy_obstacles(
+            cp["active"], cp["spawns"], cp["obstacles"])
+        self._window = None
+        self.lane_index.clear()
+        for ob in self._active.values():
+            self.lane_index.add(ob)
+        for ob in self.spawns.active.values():
+            self.lane_index.add(ob)
+        self.result = None
+        # Los checkpoints posteriores pertenecen a un futuro que ya no ocurrió
+        while self.checkpoints and self.checkpoints[-1]["tick"] > self.tick:
+            self.checkpoints.pop()
+
+    def rewind(self, seconds=3):
+        """Retrocede unos segundos hasta el checkpoint correspondiente. Devuelve False si no hay."""
+        target = self.tick - seconds * self.checkpoint_every
+        candidates = [cp for cp in self.checkpoints if cp["tick"] <= target]
+        if not candidates and not self.checkpoints:
+            return False
+        self.restore_checkpoint(candidates[-1] if candidates else self.checkpoints[0])
+        return True
+
+    @staticmethod
+    def _copy_obstacles(active, spawns, obstacles):
+        """Copia los dicts de obstáculos conservando que un mismo obstáculo aparezca como un
+        único objeto en las tres colecciones (activos del árbol, spawns y visibles)."""
+        copies = {}
+
+        def dup(ob):
+            if id(ob) not in copies:
+                copies[id(ob)] = dict(ob)
+            return copies[id(ob)]
+
+        return ({key: dup(ob) for key, ob in active.items()},
+                spawns.copy(dup),
+                [dup(ob) for ob in obstacles])
+
+    def car_y(self):
+        """Posición Y del carro con offset de salto"""
+        base = self.lane_y[self.car_lane]
+        if not self.jumping:
+            return base
+        # parabólica simple
+        peak = self.jump_max // 2
+        d = self.jump_progress - peak
+        return base - int(self.jump_height - (d * d * self.jump_height) / (peak * peak))
+
+    @staticmethod
+    def check_collision(r1, r2):
+        x1, y1, w1, h1 = r1
+        x2, y2, w2, h2 = r2
+        return not (x1+w1 < x2 or x1 > x2+w2 or y1+h1 < y2 or y1 > y2+h2)
+
+    def _touched(self, car_rect):
+        """Pares (obstáculo, golpe nuevo) que tocan car_rect, según el índice por carril."""
+        for ob in list(self.lane_index.query(*car_rect)):
+            # rect del obstáculo en coordenadas de mundo (igual que car_rect)
+            ob_rect = (
+                ob["x_world"],
+                self.lane_y[ob.get("lane_idx", 1)] - ob.get("height", 32),
+                ob.get("width", 32),
+                ob.get("height", 32),
+            )
+            if self.check_collision(car_rect, ob_rect):
+                # Generador: "hit" se lee después de procesar los anteriores, como antes
+                yield ob, not ob.get("hit", False)
+
+    def _activate_from_avl(self, x_lo, x_hi):
+        """Activa los obstáculos del árbol con x_world en [x_lo, x_hi) usando AVLTree.range.
+        Si el árbol no cambió dentro de la ventana anterior y esta solo avanzó, se descartan
+        los que quedaron atrás y se consulta solo el tramo nuevo; si no, se rearma entera
+        reutilizando la copia ya activa de cada nodo para conservar su estado (p. ej. "hit")."""
+        window, evicted_below = self._window, self._evicted_below
+        self._window = (x_lo, x_hi)
+        self._evicted_below = float("-inf")
+        index = self.lane_index
+        if window is not None and x_lo >= window[0] and x_hi >= window[1] and evicted_below <= x_lo:
+            # _active está en orden de clave: los que quedaron atrás están al principio
+            active = self._active
+            while active:
+                key = next(iter(active))
+                if key[0] >= x_lo:
+                    break
+                index.discard(active.pop(key))
+            if self.avl_tree:
+                for node in self.avl_tree.range(max(window[1], x_lo), x_hi):
+                    ob = self._new_active(node)
+                    if ob is not None:
+                        active[node.key] = ob
+            return
+
+        active = {}
+        if self.avl_tree:
+            for node in self.avl_tree.range(x_lo, x_hi):
+                ob = self._active.get(node.key)
+                if ob is None:
+                    ob = self._new_active(node)
+                    if ob is None:
+                        continue
+                active[node.key] = ob
+        # Los que salieron de la ventana dejan de participar en colisiones
+        for key, ob in self._active.items():
+            if key not in active:
+                index.discard(ob)
+        self._active = active
+
+    def _new_active(self, node):
+        """Copia activa del obstáculo de node, ya agregada al índice por carril."""
+        # Los obstáculos agregados en caliente ya entran por self.spawns
+        if type(node.obstacle) is _TreeSpawn:
+            return None
+        ob = node.obstacle.copy()
+        ob.setdefault("x_world", node.key[0])
+        ob.setdefault("lane_idx", node.key[1])
+        if "id" not in ob:
+            ob["id"] = self.rng_ids.randint(100000, 999999)
+        ob.setdefault("width", 32)
+        ob.setdefault("height", 32)
+        self.lane_index.add(ob)
+        return ob
+
+    def register_new_obstacle(self, template: dict):
+        """Registrar un nuevo obstáculo: lo agrega como spawn a la derecha (no se moverá si !running)."""
+        ob = template.copy()
+        ob.setdefault("width", 32)
+        ob.setdefault("height", 32)
+        if "id" not in ob:
+            ob["id"] = self.rng_ids.randint(100000, 999999)
+        # Ubicar a la derecha del viewport actual para que 'entre' desde la derecha
+        ob["x_world"] = self.world_offset + max(self.view_width, 800) + 150 + self.rng_spawn.randint(0, 300)
+        if "lane_idx" not in ob:
+            ob["lane_idx"] = self.rng_spawn.randint(0, len(self.lane_y)-1)
+        self.spawns.add(ob)
+        # Añadir también a self.obstacles para feedback visual inmediato (no se moverá hasta start)
+        self.obstacles.append(ob)
+        return ob
+
+    def add_random_obstacle(self):
+        """Obstáculo de tipo y carril al azar: se inserta en el árbol (para verlo en TreeWidget)
+        y se registra como spawn a la derecha del viewport."""
+        obstacle_type = self.rng_spawn.choice(OBSTACLE_TYPES)
+        ob = _TreeSpawn({
+            "id": self.rng_ids.randint(1000, 9999),
+            "name": obstacle_type["name"],
+            "color": obstacle_type["color"],
+            "text_color": obstacle_type["text_color"],
+            "lane_idx": self.rng_spawn.randint(0, len(self.lane_y)-1),
+            "width": 32,
+            "height": 32,
+        })
+        # La clave en el árbol usa una X temporal (no se usa para dibujo directo)
+        key = (self.world_offset + 1000 + self.rng_spawn.randint(0, 1000), ob["lane_idx"])
+        if self.avl_tree is not None:
+            self.avl_tree.insert(key, ob)
+        return self.register_new_obstacle(ob)
+
+    def state_digest(self):
+        """Resumen del estado de la partida para comprobar que una repetición es idéntica."""
+        h = hashlib.blake2b(digest_size=16)
+        h.update(repr((
+            self.tick, self.world_offset, self.lives, self.car_lane, self.jumping,
+            self.jump_progress, self.result, sorted(self._active),
+            [(ob["id"], ob["x_world"], ob["lane_idx"]) for ob in self.spawns],
+            self.avl_tree.get_size(self.avl_tree.root) if self.avl_tree else 0,
+        )).encode("utf-8"))
+        return h.digest()
+
+    def run(self, max_ticks, inputs=None):
+        """Ejecuta hasta max_ticks ticks sin pantalla, o hasta que termine la partida.
+        inputs: dict opcional tick -> lista de acciones. Devuelve self.result."""
+        self.running = True
+        inputs = inputs or {}
+        for _ in range(max_ticks):
+            if self.step(inputs.get(self.tick + 1, ())) is not None:
+                break
+        return self.result
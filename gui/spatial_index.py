@@ -0,0 +1,56 @@
+from gui.avl_tree import AVLTree
+
+class LaneIndex:
+    """Índice espacial por carril para la fase amplia (broad-phase) de colisiones.
+
+    Cada carril es un AVLTree con clave (x_world, secuencia), así que una consulta solo
+    recorre los obstáculos de los carriles y del rango de X que pueden tocar el rectángulo.
+    max_width / max_height acotan cuánto se extiende un obstáculo desde su x_world y desde
+    la línea de su carril."""
+
+    def __init__(self, lane_y):
+        self.lane_y = lane_y
+        self.lanes = [AVLTree() for _ in lane_y]
+        self.max_width = 0
+        self.max_height = 0
+        # id(obstáculo) -> (carril, clave en el árbol del carril)
+        self._entries = {}
+        self._seq = 0
+
+    def __contains__(self, ob):
+        return id(ob) in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, ob):
+        if id(ob) in self._entries:
+            return
+        lane = ob["lane_idx"]
+        self._seq += 1
+        key = (ob["x_world"], self._seq)
+        self.lanes[lane].insert(key, ob)
+        self._entries[id(ob)] = (lane, key)
+        self.max_width = max(self.max_width, ob["width"])
+        self.max_height = max(self.max_height, ob["height"])
+
+    def discard(self, ob):
+        entry = self._entries.pop(id(ob), None)
+        if entry:
+            lane, key = entry
+            self.lanes[lane].delete(key)
+
+    def clear(self):
+        self.lanes = [AVLTree() for _ in self.lane_y]
+        self._entries = {}
+
+    def query(self, x, y, w, h):
+        """Genera los obstáculos cuyo rectángulo puede tocar (x, y, w, h), en coordenadas de mundo.
+        Es un superconjunto: el llamador hace la prueba exacta de colisión."""
+        x_lo = x - self.max_width
+        # range() es semiabierto y la prueba de colisión es inclusiva en los bordes
+        x_hi = x + w + 1
+        for lane, base_y in enumerate(self.lane_y):
+            if base_y >= y and base_y - self.max_height <= y + h:
+                for node in self.lanes[lane].range(x_lo, x_hi):
+                    yield node.obstacle
@@ -0,0 +1,89 @@
+import heapq
+
+
+class SpawnScheduler:
+    """Obstáculos agregados en caliente (register_new_obstacle) hasta que el jugador los pasa.
+
+    Los pendientes esperan en un min-heap por x_world y se activan cuando entran a la ventana
+    [x_lo, x_hi); los activos están en otro heap por x_world y se retiran al quedar detrás de
+    x_lo. Cada advance() cuesta O((activaciones + retiros) log n), no O(total registrado).
+
+    Los obstáculos se guardan por número de entrada y no por "id": los ids al azar pueden
+    repetirse. Iterar recorre pendientes y activos en orden de registro; active y los
+    activados de advance() también quedan en ese orden."""
+
+    def __init__(self):
+        self._seq = 0
+        # (x_world, entrada); las entradas que ya no están en pending/active se ignoran al salir
+        self._pending_heap = []
+        self._active_heap = []
+        # entrada -> obstáculo
+        self.pending = {}
+        self.active = {}
+        self._x_hi = float("-inf")
+
+    def __len__(self):
+        return len(self.pending) + len(self.active)
+
+    def __iter__(self):
+        entries = sorted(list(self.pending.items()) + list(self.active.items()),
+                         key=lambda item: item[0])
+        return (ob for _seq, ob in entries)
+
+    def add(self, ob):
+        self._seq += 1
+        self.pending[self._seq] = ob
+        heapq.heappush(self._pending_heap, (ob["x_world"], self._seq))
+
+    def advance(self, x_lo, x_hi):
+        """Mueve la ventana a [x_lo, x_hi). Devuelve (activados, retirados) en este paso."""
+        activated, retired = [], []
+        if x_hi < self._x_hi:
+            # La ventana se achicó (vista más angosta): los activos fuera vuelven a esperar
+            for seq, ob in list(self.active.items()):
+                if ob["x_world"] >= x_hi:
+                    del self.active[seq]
+                    self.pending[seq] = ob
+                    heapq.heappush(self._pending_heap, (ob["x_world"], seq))
+                    retired.append(ob)
+        self._x_hi = x_hi
+
+        heap = self._pending_heap
+        while heap and heap[0][0] < x_hi:
+            x_world, seq = heapq.heappop(heap)
+            ob = self.pending.pop(seq, None)
+            if ob is None:
+                continue
+            if x_world < x_lo:
+                # Quedó atrás sin llegar a verse
+                continue
+            heapq.heappush(self._active_heap, (x_world, seq))
+            activated.append((seq, ob))
+        if activated:
+            # El heap los entrega por x_world; se activan en orden de registro, como el recorrido
+            # por tick de antes (orden de dibujo y de alta en el índice por carril)
+            activated.sort(key=lambda item: item[0])
+            if self.active and activated[0][0] < next(reversed(self.active)):
+                self.active = dict(sorted([*self.active.items(), *activated], key=lambda item: item[0]))
+            else:
+                self.active.update(activated)
+            activated = [ob for _seq, ob in activated]
+
+        heap = self._active_heap
+        while heap and heap[0][0] < x_lo:
+            _x_world, seq = heapq.heappop(heap)
+            ob = self.active.pop(seq, None)
+            if ob is not None:
+                retired.append(ob)
+        return activated, retired
+
+    def copy(self, dup=dict):
+        """Copia independiente; dup(ob) copia cada obstáculo (checkpoints de la simulación)."""
+        clone = SpawnScheduler()
+        clone._seq = self._seq
+        clone._pending_heap = list(self._pending_heap)
+        clone._active_heap = list(self._active_heap)
+        clone.pending = {seq: dup(ob) for seq, ob in self.pending.items()}
+        clone.active = {seq: dup(ob) for seq, ob in self.active.items()}
+        clone._x_hi = self._x_hi
+        return clone
@@ -0,0 +1,41 @@
+from collections import OrderedDict
+
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QPixmap
+
+
+class SpriteCache:
+    """Caché LRU de QPixmap pre-renderizados.
+
+    get(key, size, render, dpr) devuelve el pixmap de key; si no está, crea uno transparente de
+    size (en píxeles lógicos), lo dibuja con render(pixmap) y lo guarda, descartando el usado
+    hace más tiempo cuando se supera max_entries."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._sprites = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._sprites)
+
+    def get(self, key, size, render, dpr=1.0):
+        sprite = self._sprites.get(key)
+        if sprite is not None:
+            self.hits += 1
+            self._sprites.move_to_end(key)
+            return sprite
+        self.misses += 1
+        width, height = size
+        sprite = QPixmap(max(1, round(width * dpr)), max(1, round(height * dpr)))
+        sprite.setDevicePixelRatio(dpr)
+        sprite.fill(Qt.GlobalColor.transparent)
+        render(sprite)
+        self._sprites[key] = sprite
+        if len(self._sprites) > self.max_entries:
+            self._sprites.popitem(last=False)
+        return sprite
+
+    def clear(self):
+        self._sprites.clear()
@@ -1,7 +1,32 @@
 from PyQt6.QtWidgets import QWidget, QVBoxLayout, QPushButton, QLabel, QHBoxLayout, QGridLayout
-from PyQt6.QtGui import QPainter, QColor, QFont, QPen, QBrush, QLinearGradient
-from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtGui import (QPainter, QColor, QFont, QPen, QBrush, QLinearGradient, QGradient, QPixmap,
+                         QPolygonF)
+from PyQt6.QtCore import Qt, QTimer, QPointF, QRectF
+import time
+from collections.abc import Mapping
+from itertools import islice
 from gui.avl_tree import AVLTree
+from gui.obstacle_types import OBSTACLE_TYPES
+
+# Máximo de nodos listados en la etiqueta de recorrido
+MAX_TRAVERSAL_LABEL_NODES = 100
+
+# Distribución del árbol: x según la posición en orden (SLOT px por nodo), y según la
+# profundidad. Dos nodos del mismo nivel quedan al menos a 2 * SLOT, más que NODE_SIZE.
+NODE_SIZE = 50
+SLOT = 28
+ROW = 80
+TREE_TOP = 120
+# Nivel de detalle: debajo de este ancho en pantalla un subárbol se dibuja como un glifo
+# (cantidad de nodos y altura); debajo de DETAIL_ZOOM los nodos se dibujan sin texto
+GLYPH_MAX_WIDTH = 48
+DETAIL_ZOOM = 0.75
+MIN_ZOOM, MAX_ZOOM = 1e-4, 4.0
+# Al alejarse, los niveles no se aplastan tanto como el ancho: una vista general sigue
+# mostrando la forma de los primeros niveles
+MIN_ROW_ZOOM = 0.4
+# Intervalo mínimo entre repintados por cambios del árbol (cada uno re-renderiza el pixmap)
+TREE_REPAINT_MS = 100
 
 class TreeWidget(QWidget):
     def __init__(self, avl: AVLTree, parent=None):
@@ -10,21 +35,50 @@ class TreeWidget(QWidget):
         self.setMinimumWidth(500)
         self.setMinimumHeight(400)
 
-        self.highlighted_nodes = []
+        # Recorrido animado: se consume el generador del árbol un nodo por tick
+        self.highlighted_node = None
+        self._highlight_iter = None
         self.highlight_timer = QTimer(self)
         self.highlight_timer.timeout.connect(self._update_highlight)
 
+        # Repintado por eventos del árbol: a lo sumo uno cada TREE_REPAINT_MS y ninguno si el
+        # árbol no cambia
+        self._repaint_timer = QTimer(self)
+        self._repaint_timer.setSingleShot(True)
+        self._repaint_timer.setInterval(TREE_REPAINT_MS)
+        self._repaint_timer.timeout.connect(self.update)
+        avl.subscribe(self._on_tree_changed)
+        self.destroyed.connect(lambda: avl.unsubscribe(self._on_tree_changed))
+
+        # Vista: pantalla = árbol * zoom + pan. Se ajusta sola hasta que el usuario la mueve
+        self._zoom = 1.0
+        self._pan_x = 0.0
+        self._pan_y = float(TREE_TOP)
+        self._auto_fit = True
+        self._drag_pos = None
+        # perf.PerfMonitor del juego mientras el HUD de rendimiento está activo (F3)
+        self.perf = None
+        # Caché de dibujo: pixmap del árbol sin resaltado y posición en pantalla de cada nodo
+        # dibujado en él (ver _static_pixmap)
+        self._drawn = {}
+        self._pixmap = None
+        self._pixmap_key = None
+        # Plumas, pinceles y fuentes se crean una vez y no en cada nodo de cada repintado
+        self._line_pen = QPen(QColor("#34495E"), 3, Qt.PenStyle.SolidLine)
+        self._line_pen.setCapStyle(Qt.PenCapStyle.RoundCap)
+        self._border_pen = QPen(QColor("#2C3E50"), 2)
+        self._highlight_pen = QPen(QColor("#FFD700"), 4)
+        self._shadow_brush = QBrush(QColor(0, 0, 0, 50))
+        self._bold_font = QFont("Segoe UI", 8, QFont.Weight.Bold)
+        self._small_font = QFont("Segoe UI", 7, QFont.Weight.Normal)
+        self._glyph_pen = QPen(QColor("#34495E"), 1)
+        self._glyph_brush = QBrush(QColor(52, 73, 94, 60))
+        self._glyph_text_pen = QPen(QColor("#2C3E50"), 1)
+        self._brushes = {}
+        self._text_pens = {}
+
         # Lista de tipos de obstáculos con sus colores
-        self.obstacle_types = [
-            {"name": "Aceite", "color": "#2C3E50", "text_color": "#ECF0F1"},
-            {"name": "Hueco", "color": "#8B4513", "text_color": "#FFFFFF"},
-            {"name": "Cono", "color": "#E67E22", "text_color": "#FFFFFF"},
-            {"name": "Piedra", "color": "#95A5A6", "text_color": "#2C3E50"},
-            {"name": "Charco", "color": "#3498DB", "text_color": "#FFFFFF"},
-            {"name": "Rama", "color": "#27AE60", "text_color": "#FFFFFF"},
-            {"name": "Vidrio", "color": "#E8F8F5", "text_color": "#2C3E50"},
-            {"name": "Metal", "color": "#566573", "text_color": "#FFFFFF"}
-        ]
+        self.obstacle_types = OBSTACLE_TYPES
 
         layout = QVBoxLayout(self)
         layout.setSpacing(15)
@@ -94,142 +148,287 @@ class TreeWidget(QWidget):
         """)
 
     def _add_random_obstacle(self):
-        import random
-        lane = random.randint(0, len(self.parent().game.lane_y)-1)
-        obstacle_type = random.choice(self.obstacle_types)
-        ob = {
-            "id": random.randint(1000, 9999),
-            "name": obstacle_type["name"],
-            "color": obstacle_type["color"],
-            "text_color": obstacle_type["text_color"],
-            "lane_idx": lane,
-            "width": 32,
-            "height": 32,
-        }
-        # La clave en el árbol usa una X temporal (no se usa para dibujo directo)
-        key = (self.parent().game.world_offset + 1000 + random.randint(0, 1000), ob["lane_idx"])
-        self.avl.insert(key, ob)
-        # Notificar al GameWidget para que se cree el spawn desde la derecha
+        # La simulación elige tipo, carril y posición con su generador sembrado y lo inserta
+        # en el árbol en el próximo tick, así la acción queda grabada y se puede repetir
         try: 
-            self.parent().game.register_new_obstacle(ob)
+            self.parent().game.add_random_obstacle()
         except Exception:
             pass
         self.update()
     
     def show_traversal(self, traversal_type):
         traversal_map = {
-            'bfs': self.avl.bfs,
-            'preorder': self.avl.preorder,
-            'inorder': self.avl.inorder,
-            'postorder': self.avl.postorder,
+            'bfs': self.avl.iter_bfs,
+            'preorder': self.avl.iter_preorder,
+            'inorder': self.avl.iter_inorder,
+            'postorder': self.avl.iter_postorder,
         }
-        nodes = traversal_map.get(traversal_type, self.avl.inorder)()
-        self.highlighted_nodes = list(nodes) 
-        
-        path_text = " -> ".join([f"#{node.obstacle['id']}" for node in nodes])
+        traverse = traversal_map.get(traversal_type, self.avl.iter_inorder)
+        # Para el texto basta con los primeros nodos; no se materializa todo el recorrido
+        nodes = list(islice(traverse(), MAX_TRAVERSAL_LABEL_NODES + 1))
+        path_text = " -> ".join([f"#{node.obstacle['id']}" for node in nodes[:MAX_TRAVERSAL_LABEL_NODES]])
+        if len(nodes) > MAX_TRAVERSAL_LABEL_NODES:
+            path_text += " -> ..."
         self.traversal_label.setText(f"Recorrido {traversal_type.upper()}: {path_text}")
-        
-        if self.highlighted_nodes:
+
+        self._highlight_iter = traverse()
+        self.highlighted_node = next(self._highlight_iter, None)
+        if self.highlighted_node is not None:
             self.highlight_timer.start(300)
 
     def paintEvent(self, _event):
+        perf = self.perf
+        if perf:
+            t0 = time.perf_counter()
         p = QPainter(self)
+        # El árbol estático sale de la caché; encima solo se dibuja el nodo resaltado
+        p.drawPixmap(0, 0, self._static_pixmap())
+        node = self.highlighted_node
+        if node is not None and node in self._drawn:
+            x, y = self._drawn[node]
+            p.setRenderHint(QPainter.RenderHint.Antialiasing)
+            self._draw_scaled_node(p, node, x, y, highlighted=True)
+        if perf:
+            p.end()
+            perf.record("paint_tree", time.perf_counter() - t0)
+
+    def _on_tree_changed(self, _events):
+        if not self._repaint_timer.isActive():
+            self._repaint_timer.start()
+
+    def _update_highlight(self):
+        if self.highlighted_node is None:
+            self.highlight_timer.stop()
+            self.update() 
+            return
+        self.highlighted_node = next(self._highlight_iter, None)
+        self.update()
+
+    # ---------- vista: desplazamiento y zoom ----------
+    def _fit_view(self):
+        """Todo el árbol a lo ancho (sin agrandarlo) y la raíz arriba, como la vista original."""
+        count = self.avl.get_size(self.avl.root)
+        self._zoom = max(MIN_ZOOM, min(1.0, (self.width() - 40) / max(1, count * SLOT)))
+        self._pan_x = (self.width() - count * SLOT * self._zoom) / 2
+        self._pan_y = float(TREE_TOP)
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.MouseButton.LeftButton:
+            self._drag_pos = event.position()
+        super().mousePressEvent(event)
+
+    def mouseMoveEvent(self, event):
+        if self._drag_pos is not None:
+            pos = event.position()
+            self._pan_x += pos.x() - self._drag_pos.x()
+            self._pan_y += pos.y() - self._drag_pos.y()
+            self._drag_pos = pos
+            self._auto_fit = False
+            self.update()
+        super().mouseMoveEvent(event)
+
+    def mouseReleaseEvent(self, event):
+        self._drag_pos = None
+        super().mouseReleaseEvent(event)
+
+    def mouseDoubleClickEvent(self, event):
+        # Volver a la vista completa
+        self._auto_fit = True
+        self.update()
+        super().mouseDoubleClickEvent(event)
+
+    def wheelEvent(self, event):
+        # Zoom alrededor del cursor: el punto del árbol bajo el mouse no se mueve
+        steps = event.angleDelta().y() / 120
+        if not steps:
+            return
+        zoom = min(MAX_ZOOM, max(MIN_ZOOM, self._zoom * 1.25 ** steps))
+        factor = zoom / self._zoom
+        row_factor = self._row_zoom(zoom) / self._row_zoom(self._zoom)
+        pos = event.position()
+        self._pan_x = pos.x() - (pos.x() - self._pan_x) * factor
+        self._pan_y = pos.y() - (pos.y() - self._pan_y) * row_factor
+        self._zoom = zoom
+        self._auto_fit = False
+        self.update()
+
+    @staticmethod
+    def _row_zoom(zoom):
+        return max(zoom, MIN_ROW_ZOOM)
+
+    # ---------- caché de dibujo ----------
+    def _static_pixmap(self):
+        """Fondo y árbol sin resaltado, redibujados solo cuando cambia la versión del árbol,
+        el árbol mismo, el tamaño del widget o la vista."""
+        if self._auto_fit:
+            self._fit_view()
+        key = (id(self.avl), self.avl.version, self.width(), self.height(), self.devicePixelRatioF(),
+               self._zoom, self._pan_x, self._pan_y)
+        if self._pixmap is None or self._pixmap_key != key:
+            self._pixmap = self._render_tree()
+            self._pixmap_key = key
+        return self._pixmap
+
+    def _visible_items(self):
+        """Recorre el árbol desde la raíz descartando los subárboles cuya caja queda fuera del
+        widget y cortando en glifos los que ocupan menos de GLYPH_MAX_WIDTH px. Devuelve
+        (aristas, nodos, glifos) en coordenadas de pantalla; el costo depende de lo visible y no
+        del tamaño del árbol."""
+        zoom, pan_x, pan_y = self._zoom, self._pan_x, self._pan_y
+        row = ROW * self._row_zoom(zoom)
+        width, height = self.width(), self.height()
+        radius = max(2.0, NODE_SIZE * zoom / 2)
+        edges, nodes, glyphs = [], [], []
+        get_size = self.avl.get_size
+        # (nodo, índice en orden del primer nodo del subárbol, profundidad, posición del padre)
+        stack = [(self.avl.root, 0, 0, None)]
+        while stack:
+            node, offset, depth, parent_pos = stack.pop()
+            x0 = pan_x + offset * SLOT * zoom
+            x1 = pan_x + (offset + node.size) * SLOT * zoom
+            y = pan_y + depth * row
+            y_bottom = y + (node.height - 1) * row
+            if x1 + radius < 0 or x0 - radius > width or y - radius > height or y_bottom + radius < 0:
+                continue
+            left_size = get_size(node.left)
+            pos = (pan_x + (offset + left_size + 0.5) * SLOT * zoom, y)
+            if parent_pos:
+                edges.append((parent_pos, pos))
+            if node.size > 1 and x1 - x0 < GLYPH_MAX_WIDTH:
+                glyphs.append((node, x0, x1, y))
+                continue
+            nodes.append((node, pos))
+            if node.right:
+                stack.append((node.right, offset + left_size + 1, depth + 1, pos))
+            if node.left:
+                stack.append((node.left, offset, depth + 1, pos))
+        return edges, nodes, glyphs
+
+    def _render_tree(self):
+        dpr = self.devicePixelRatioF()
+        pixmap = QPixmap(int(self.width() * dpr), int(self.height() * dpr))
+        pixmap.setDevicePixelRatio(dpr)
+        p = QPainter(pixmap)
         p.setRenderHint(QPainter.RenderHint.Antialiasing)
-        
+
         # Fondo con gradiente
         gradient = QLinearGradient(0, 0, 0, self.height())
         gradient.setColorAt(0, QColor("#F8F9FA"))
         gradient.setColorAt(1, QColor("#E9ECEF"))
         p.fillRect(self.rect(), QBrush(gradient))
 
+        self._drawn = {}
         if not self.avl.root:
             p.setPen(QPen(QColor("#7F8C8D"), 2))
             p.setFont(QFont("Segoe UI", 12, QFont.Weight.Bold))
             p.drawText(self.rect(), Qt.AlignmentFlag.AlignCenter, 
                       "🚫 No hay obstáculos en el árbol\n\nHaz clic en 'Agregar Obstáculo' para comenzar")
-            return
-        
-        self._draw_node(p, self.avl.root, self.width() // 2, 120, self.width() // 4)
+            p.end()
+            return pixmap
 
-    def _update_highlight(self):
-        if not self.highlighted_nodes:
-            self.highlight_timer.stop()
-            self.update() 
-            return
-        self.highlighted_nodes.pop(0)
-        self.update()
+        edges, nodes, glyphs = self._visible_items()
+        # Primero las aristas y luego nodos y glifos encima
+        radius = max(2.0, NODE_SIZE * self._zoom / 2)
+        line_pen = QPen(self._line_pen)
+        line_pen.setWidthF(max(1.0, 3 * min(1.0, self._zoom)))
+        p.setPen(line_pen)
+        for (px, py), (x, y) in edges:
+            p.drawLine(QPointF(px, py + radius), QPointF(x, y - radius))
+        for node, x0, x1, y in glyphs:
+            self._draw_glyph(p, node, x0, x1, y)
+        for node, (x, y) in nodes:
+            self._draw_scaled_node(p, node, x, y)
+            self._drawn[node] = (x, y)
+        p.end()
+        return pixmap
 
-    def _draw_node(self, p, node, x, y, dx):
-        if not node:
+    def _draw_scaled_node(self, p, node, x, y, highlighted=False):
+        zoom = self._zoom
+        if zoom >= DETAIL_ZOOM:
+            p.save()
+            p.translate(x, y)
+            p.scale(zoom, zoom)
+            self._draw_node_body(p, node, 0, 0, highlighted)
+            p.restore()
             return
+        # Lejos: solo el círculo del color del obstáculo, sin sombra ni texto
+        radius = max(2.0, NODE_SIZE * zoom / 2)
+        obstacle = node.obstacle
+        color = obstacle["color"] if isinstance(obstacle, Mapping) and "color" in obstacle else "#3498DB"
+        p.setBrush(self._node_brush(color))
+        p.setPen(self._highlight_pen if highlighted else Qt.PenStyle.NoPen)
+        p.drawEllipse(QPointF(x, y), radius, radius)
 
-        line_pen = QPen(QColor("#34495E"), 3, Qt.PenStyle.SolidLine)
-        line_pen.setCapStyle(Qt.PenCapStyle.RoundCap)
-        p.setPen(line_pen)
-        
-        if node.left:
-            p.drawLine(x - 5, y + 25, x - dx + 5, y + 75)
-            self._draw_node(p, node.left, x - dx, y + 80, dx // 2)
-            
-        if node.right:
-            p.drawLine(x + 5, y + 25, x + dx - 5, y + 75)
-            self._draw_node(p, node.right, x + dx, y + 80, dx // 2)
+    def _draw_glyph(self, p, node, x0, x1, y):
+        """Subárbol colapsado: triángulo con su cantidad de nodos y su altura."""
+        x0, x1 = min(x0, x1 - 12), max(x1, x0 + 12)
+        bottom = y + max(14.0, min(40.0, (node.height - 1) * ROW * self._row_zoom(self._zoom)))
+        p.setPen(self._glyph_pen)
+        p.setBrush(self._glyph_brush)
+        p.drawPolygon(QPolygonF([QPointF((x0 + x1) / 2, y), QPointF(x1, bottom), QPointF(x0, bottom)]))
+        if x1 - x0 >= 30:
+            p.setPen(self._glyph_text_pen)
+            p.setFont(self._small_font)
+            p.drawText(QRectF(x0 - 10, bottom + 1, x1 - x0 + 20, 22), Qt.AlignmentFlag.AlignHCenter,
+                       f"{node.size}\nh={node.height}")
+
+    def _node_brush(self, color):
+        """Pincel con gradiente relativo al rectángulo del nodo: uno por color sirve para todos."""
+        brush = self._brushes.get(color)
+        if brush is None:
+            node_color = QColor(color)
+            gradient = QLinearGradient(0, 0, 1, 1)
+            gradient.setCoordinateMode(QGradient.CoordinateMode.ObjectBoundingMode)
+            gradient.setColorAt(0, node_color.lighter(120))
+            gradient.setColorAt(1, node_color.darker(110))
+            brush = self._brushes[color] = QBrush(gradient)
+        return brush
+
+    def _text_pen(self, color):
+        pen = self._text_pens.get(color)
+        if pen is None:
+            pen = self._text_pens[color] = QPen(QColor(color), 1)
+        return pen
 
+    def _draw_node_body(self, p, node, x, y, highlighted=False):
         # Dibujar el nodo solo si tiene datos válidos
         node_size = 50
         obstacle = node.obstacle
         
-        # Validación del obstáculo
-        if not obstacle or not isinstance(obstacle, dict):
+        # Validación del obstáculo (Mapping: también los obstáculos perezosos de .avlb)
+        if not obstacle or not isinstance(obstacle, Mapping):
             return
             
-        if obstacle and "color" in obstacle:
+        if "color" in obstacle:
             # Color del obstáculo
-            node_color = QColor(obstacle["color"])
-            text_color = QColor(obstacle["text_color"])
+            node_color, text_color = obstacle["color"], obstacle["text_color"]
         else:
             # Color por defecto
-            node_color = QColor("#3498DB")
-            text_color = QColor("#FFFFFF")
+            node_color, text_color = "#3498DB", "#FFFFFF"
 
         # Sombra del nodo
-        shadow_brush = QBrush(QColor(0, 0, 0, 50))
-        p.setBrush(shadow_brush)
+        p.setBrush(self._shadow_brush)
         p.setPen(Qt.PenStyle.NoPen)
         p.drawEllipse(x - node_size//2 + 3, y - node_size//2 + 3, node_size, node_size)
 
-        gradient = QLinearGradient(x - node_size//2, y - node_size//2, 
-                                 x + node_size//2, y + node_size//2)
-        gradient.setColorAt(0, node_color.lighter(120))
-        gradient.setColorAt(1, node_color.darker(110))
-        
-        node_brush = QBrush(gradient)
-        p.setBrush(node_brush)
-        
+        p.setBrush(self._node_brush(node_color))
         # Borde del nodo (resaltado si está en la animación)
-        is_highlighted = self.highlighted_nodes and self.highlighted_nodes[0] == node
-        border_color = QColor("#FFD700") if is_highlighted else QColor("#2C3E50")
-        border_width = 4 if is_highlighted else 2
-        border_pen = QPen(border_color, border_width)
-        p.setPen(border_pen)
+        p.setPen(self._highlight_pen if highlighted else self._border_pen)
         p.drawEllipse(x - node_size//2, y - node_size//2, node_size, node_size)
 
-        p.setPen(QPen(text_color, 1))
+        p.setPen(self._text_pen(text_color))
         
         key_x, key_y = node.key
 
         # ID en la parte superior
-        id_text = f"#{node.obstacle['id']}" if node.obstacle else f"#{key_x}"
-        p.setFont(QFont("Segoe UI", 8, QFont.Weight.Bold))
+        id_text = f"#{obstacle['id']}"
+        p.setFont(self._bold_font)
         p.drawText(x - 25, y - 15, 50, 12, Qt.AlignmentFlag.AlignCenter, id_text)
         
         # Nombre del obstáculo en el centro
-        if obstacle and "name" in obstacle:
-            name_text = obstacle["name"]
-            p.setFont(QFont("Segoe UI", 8, QFont.Weight.Bold))
-            p.drawText(x - 25, y - 5, 50, 12, Qt.AlignmentFlag.AlignCenter, name_text)
+        if "name" in obstacle:
+            p.drawText(x - 25, y - 5, 50, 12, Qt.AlignmentFlag.AlignCenter, obstacle["name"])
         
         # Posición X en la parte inferior
-        pos_text = f"({key_x}, {key_y})"
-        p.setFont(QFont("Segoe UI", 7, QFont.Weight.Normal))
-        p.drawText(x - 25, y + 8, 50, 12, Qt.AlignmentFlag.AlignCenter, pos_text)
\ No newline at end of file
+        p.setFont(self._small_font)
+        p.drawText(x - 25, y + 8, 50, 12, Qt.AlignmentFlag.AlignCenter, f"({key_x}, {key_y})")
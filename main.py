@@ -1,13 +1,21 @@
+import argparse
 import sys
 from PyQt6.QtWidgets import QApplication, QMainWindow, QStackedWidget, QMessageBox
 from PyQt6.QtCore import QTimer
-from gui.json_loader import load_game_from_json
+from gui.level_cache import LevelCache
+from gui.levels import open_level
+from gui.replay import InputRecorder, Recording
 from gui.gameplay_widget import GameplayWidget
 from gui.menu_widget import MenuWidget
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, record_path=None, replay=None, replay_speed=1):
         super().__init__()
+        # Grabación de la partida (.avlr) y repetición en pantalla (ver gui/replay.py)
+        self.record_path = record_path
+        self.recorder = None
+        self.replay = replay
+        self.replay_speed = replay_speed
 
         self.setWindowTitle("Proyecto AVL - Estructuras de Datos 2025 - II")
 
@@ -17,7 +25,9 @@ class MainWindow(QMainWindow):
         self.menu = MenuWidget()
 
         self.gameplay = None 
-        self.load_level("level1.json")
+        # Niveles ya construidos: recargar el mismo archivo no vuelve a parsear ni a armar el árbol
+        self.level_cache = LevelCache()
+        self.load_level(replay.level_path if replay else "level1.json")
 
         self.stack.addWidget(self.menu)
         self.menu.start_signal.connect(self.start_game)
@@ -29,6 +39,9 @@ class MainWindow(QMainWindow):
 
     def start_game(self):
         self.stack.setCurrentWidget(self.gameplay)
+        if self.gameplay.game.replaying:
+            # La grabación ya contiene el "Jugar" original entre sus acciones
+            return
         self.gameplay.game.setFocus()
         # Iniciar simulacion del juego
         try: 
@@ -38,31 +51,60 @@ class MainWindow(QMainWindow):
         self.gameplay.game.setFocus()
 
     def exit_game(self):
+        self._close_recorder()
         QApplication.quit()
 
+    def _close_recorder(self):
+        if self.recorder:
+            self.recorder.close(self.gameplay.game.sim)
+            self.recorder = None
+
     def on_load_level_request(self, file_path):
         try:
             self.load_level(file_path)
-            QMessageBox.information(self, "Nivel Cargado", f"Se ha cargado el nivel desde:\n{file_path}")
+            QMessageBox.information(self, "Nivel Cargado", f"Se ha cargado el nivel desde:\n{file_path}\n\n{self.level_cache.describe()}")
             self.stack.setCurrentWidget(self.menu)
         except Exception as e:
             QMessageBox.critical(self, "Error de Carga", f"No se pudo cargar el archivo de nivel.\nError: {e}")
 
     def load_level(self, file_path):
+        self._close_recorder()
         if self.gameplay:
+            if self.gameplay.game.sim.level_stream:
+                self.gameplay.game.sim.level_stream.close()
             self.stack.removeWidget(self.gameplay)
             self.gameplay.deleteLater()
 
-        config, avl = load_game_from_json(file_path)
-        self.gameplay = GameplayWidget(avl, parent=self.stack)
+        config, avl, stream = open_level(file_path, self.level_cache)
+        self.gameplay = GameplayWidget(avl, parent=self.stack, seed=self.replay.seed if self.replay else None)
+        self.gameplay.game.sim.level_stream = stream
+        if self.record_path:
+            # Cada nivel cargado reemplaza la grabación anterior
+            self.recorder = InputRecorder(self.record_path, file_path, self.gameplay.game.sim.seed)
+            self.gameplay.game.sim.recorder = self.recorder
+        if self.replay:
+            # La repetición arranca desde el primer frame, igual que el timer de la partida grabada
+            self.gameplay.game.replay(self.replay, self.replay_speed)
+            self.replay = None
 
         self.gameplay.game.config = config
         self.gameplay.game.speed = config.get("game", {}).get("speed", self.gameplay.game.speed)
         self.gameplay.game.goal_x = config.get("game", {}).get("distance_total", self.gameplay.game.goal_x)
+        self.gameplay.game.refresh_ms = config.get("game", {}).get("refresh_ms", self.gameplay.game.refresh_ms)
+        self.gameplay.game.sim.use_vectorized(config.get("game", {}).get("vectorized", False))
         self.stack.addWidget(self.gameplay)
 
 if __name__ == '__main__':
-    app = QApplication(sys.argv)
-    w = MainWindow()
+    parser = argparse.ArgumentParser(description="Juego del árbol AVL")
+    parser.add_argument("--record", metavar="ARCHIVO", help="grabar las acciones de la partida (.avlr)")
+    parser.add_argument("--replay", metavar="ARCHIVO", help="repetir una partida grabada en pantalla")
+    parser.add_argument("--replay-speed", type=int, default=1, help="velocidad de la repetición (N veces)")
+    args, qt_args = parser.parse_known_args()
+
+    app = QApplication(sys.argv[:1] + qt_args)
+    app.aboutToQuit.connect(lambda: w._close_recorder())
+    w = MainWindow(record_path=args.record,
+                   replay=Recording(args.replay) if args.replay else None,
+                   replay_speed=args.replay_speed)
     w.show()
     sys.exit(app.exec())
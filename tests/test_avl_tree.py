@@ -0,0 +1,139 @@
+import bisect
+import random
+
+import pytest
+
+from gui.avl_tree import (EVENT_DELETED, EVENT_INSERTED, EVENT_RANGE_EVICTED, EVENT_RESET,
+                          EVENT_ROTATED, AVLTree)
+
+
+def check_invariants(tree, reference):
+    """Comprueba alturas, balance, tamaños y orden contra la lista ordenada de referencia."""
+    def walk(node, lo, hi):
+        if not node:
+            return 0, 0
+        assert (lo is None or lo < node.key) and (hi is None or node.key < hi)
+        hl, sl = walk(node.left, lo, node.key)
+        hr, sr = walk(node.right, node.key, hi)
+        assert abs(hl - hr) <= 1
+        assert node.height == 1 + max(hl, hr)
+        assert node.size == 1 + sl + sr
+        return node.height, node.size
+
+    _height, size = walk(tree.root, None, None)
+    assert size == len(reference)
+    assert [node.key for node in tree.iter_inorder()] == reference
+
+
+def random_key(rnd):
+    return (rnd.randrange(0, 2000), rnd.randrange(4))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_inserts_and_deletes_keep_avl_invariants(seed):
+    rnd = random.Random(seed)
+    tree, reference = AVLTree(), []
+    for _ in range(1500):
+        key = random_key(rnd)
+        i = bisect.bisect_left(reference, key)
+        present = i < len(reference) and reference[i] == key
+        if rnd.random() < 0.6:
+            tree.insert(key, {"key": key})
+            if not present:
+                reference.insert(i, key)
+        else:
+            tree.delete(key)
+            if present:
+                del reference[i]
+        if rnd.random() < 0.05:
+            check_invariants(tree, reference)
+    check_invariants(tree, reference)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_splits_and_joins_keep_avl_invariants(seed):
+    rnd = random.Random(seed)
+    reference = sorted({random_key(rnd) for _ in range(rnd.randrange(0, 800))})
+    tree = AVLTree.from_sorted([(key, None) for key in reference])
+    for _ in range(40):
+        pivot = random_key(rnd)
+        left, right = tree.split(pivot)
+        cut = bisect.bisect_left(reference, pivot)
+        check_invariants(left, reference[:cut])
+        check_invariants(right, reference[cut:])
+        assert tree.root is None
+        tree = AVLTree.join(left, right)
+        check_invariants(tree, reference)
+        assert left.root is None and right.root is None
+
+    threshold = rnd.randrange(0, 2000)
+    tree.remove_passed_obstacles(threshold, margin=0)
+    check_invariants(tree, reference[bisect.bisect_left(reference, (threshold,)):])
+
+
+def test_from_sorted_and_from_items_build_balanced_trees():
+    for n in (0, 1, 2, 3, 7, 8, 100, 1023, 1024):
+        keys = [(x, 0) for x in range(n)]
+        tree = AVLTree.from_sorted([(key, key) for key in keys])
+        check_invariants(tree, keys)
+        assert tree.get_height(tree.root) == n.bit_length()
+
+    rnd = random.Random(9)
+    items = [(random_key(rnd), i) for i in range(500)]
+    tree = AVLTree.from_items(items)
+    check_invariants(tree, sorted({key for key, _ob in items}))
+    # Ante claves repetidas se conserva la primera aparición, igual que insert()
+    first = {}
+    for key, ob in items:
+        first.setdefault(key, ob)
+    assert all(node.obstacle == first[node.key] for node in tree.iter_inorder())
+
+
+def test_order_statistics_and_range_match_the_sorted_list():
+    rnd = random.Random(4)
+    reference = sorted({random_key(rnd) for _ in range(600)})
+    tree = AVLTree.from_items((key, None) for key in reference)
+    for k, key in enumerate(reference):
+        assert tree.select(k).key == key
+        assert tree.rank(key) == k
+    with pytest.raises(IndexError):
+        tree.select(len(reference))
+    for _ in range(200):
+        x_lo, x_hi = rnd.randrange(-50, 2050), rnd.randrange(-50, 2050)
+        expected = [key for key in reference if x_lo <= key[0] < x_hi]
+        assert [node.key for node in tree.range(x_lo, x_hi)] == expected
+        assert tree.count_range(x_lo, x_hi) == len(expected)
+
+
+def test_batch_coalesces_consecutive_events():
+    tree = AVLTree()
+    batched, immediate = [], []
+    tree.subscribe(batched.append)
+    tree.subscribe(immediate.append, batched=False)
+
+    with tree.batch():
+        # Inserciones ascendentes: cada una después de la segunda provoca rotaciones
+        for x in range(1, 4):
+            tree.insert((x, 0), None)
+        with tree.batch():
+            tree.delete((2, 0))
+        assert batched == []
+        tree.remove_passed_obstacles(10, margin=8)
+        tree.remove_passed_obstacles(20, margin=8)
+    kinds = [event.kind for event in batched[0]]
+    assert len(batched) == 1
+    assert kinds == [EVENT_INSERTED, EVENT_INSERTED, EVENT_ROTATED, EVENT_INSERTED, EVENT_DELETED,
+                     EVENT_RANGE_EVICTED]
+    evicted = batched[0][-1]
+    assert evicted.key == (12,) and evicted.count == 2
+    # Los inmediatos reciben cada evento por separado y sin fusionar
+    assert [events[0].kind for events in immediate].count(EVENT_RANGE_EVICTED) == 2
+
+    left, right = tree.split((5, 0))
+    assert batched[-1] == [(EVENT_RESET, tree.version, None, 1)]
+    resets = []
+    left.subscribe(resets.append)
+    with left.batch():
+        left.notify_reset()
+        left.notify_reset()
+    assert [(event.kind, event.count) for event in resets[0]] == [(EVENT_RESET, 2)]
@@ -0,0 +1,9 @@
+from benchmarks.run import compare
+
+
+def test_compare_ignores_differences_below_the_noise_floor():
+    baseline = {"results": {"fast": 2e-6, "slow": 0.1}}
+    current = {"results": {"fast": 4e-6, "slow": 0.15}}
+    report = compare(current, baseline, tolerance=0.2, noise_floor=1e-5)
+    assert not report["fast"]["regression"]
+    assert report["slow"]["regression"]
@@ -0,0 +1,94 @@
+import json
+import sys
+from array import array
+
+import pytest
+
+from gui.binary_level import (BinaryLevel, convert_json_to_binary, load_game_from_binary,
+                              write_binary_level)
+from gui.json_loader import load_game_from_json
+from gui.level_generator import generate_level
+
+
+def round_trip(tmp_path, obstacles):
+    json_path = tmp_path / "level.json"
+    json_path.write_text(json.dumps({"config": {"game": {"speed": 6}}, "obstacles": obstacles}),
+                         encoding="utf-8")
+    convert_json_to_binary(str(json_path), str(tmp_path / "level.avlb"))
+    _config, from_json = load_game_from_json(str(json_path))
+    config, from_binary = load_game_from_binary(str(tmp_path / "level.avlb"))
+    assert config == {"game": {"speed": 6}}
+    return ([(node.key, dict(node.obstacle)) for node in from_json.iter_inorder()],
+            [(node.key, dict(node.obstacle)) for node in from_binary.iter_inorder()])
+
+
+def test_round_trip_keeps_absent_fields_and_float_positions(tmp_path):
+    obstacles = [
+        {"x_world": 500, "lane_idx": 1},
+        {"id": 7, "name": "Cono", "x_world": 612.75, "lane_idx": 0, "width": 20},
+        {"id": -3, "color": "#123456", "x_world": 612.5, "lane_idx": 0, "height": 40},
+        {"id": 2 ** 40, "name": "Roca", "color": "#95A5A6", "text_color": "#2C3E50",
+         "x_world": 700.0, "lane_idx": 3, "width": 32, "height": 32},
+    ]
+    from_json, from_binary = round_trip(tmp_path, obstacles)
+    assert from_binary == from_json
+    assert isinstance(from_binary[-1][1]["x_world"], float)
+    assert isinstance(from_binary[0][1]["x_world"], int)
+
+
+@pytest.mark.parametrize("bad", [{"id": "a7"}, {"id": 1.5}, {"id": 2 ** 64}, {"width": -1},
+                                 {"height": 70000}, {"lane_idx": -1}, {"x_world": "10"},
+                                 {"x_world": float("nan")}, {"x_world": True}, {"name": 7}])
+def test_unrepresentable_values_raise_value_error(tmp_path, bad):
+    ob = {"id": 1, "x_world": 500, "lane_idx": 1, "width": 32, "height": 32, **bad}
+    with pytest.raises(ValueError):
+        write_binary_level(str(tmp_path / "level.avlb"), {}, [ob])
+    assert not (tmp_path / "level.avlb").exists()
+
+
+@pytest.mark.parametrize("extra", [{"hit": True}, {"name": None}])
+def test_exact_rejects_fields_the_format_does_not_keep(tmp_path, extra):
+    ob = {"id": 1, "x_world": 500, "lane_idx": 1, **extra}
+    write_binary_level(str(tmp_path / "loose.avlb"), {}, [ob])
+    with pytest.raises(ValueError):
+        write_binary_level(str(tmp_path / "exact.avlb"), {}, [ob], exact=True)
+    assert not (tmp_path / "exact.avlb").exists()
+
+
+def test_generated_binary_matches_generated_json(tmp_path):
+    for ext in ("avlb", "json"):
+        generate_level(str(tmp_path / f"gen.{ext}"), 500, density=20, seed=3, workers=1)
+    _config, from_json = load_game_from_json(str(tmp_path / "gen.json"))
+    _config, from_binary = load_game_from_binary(str(tmp_path / "gen.avlb"))
+    assert ([(n.key, dict(n.obstacle)) for n in from_binary.iter_inorder()]
+            == [(n.key, dict(n.obstacle)) for n in from_json.iter_inorder()])
+
+
+def test_big_endian_index_path(tmp_path, monkeypatch):
+    # En una máquina big-endian el escritor invierte los bytes del índice y el lector los
+    # vuelve a invertir al cargarlo en un array
+    monkeypatch.setattr(sys, "byteorder", "big")
+    obstacles = [{"id": i, "x_world": 500 + 37.5 * i, "lane_idx": i % 4} for i in range(50)]
+    write_binary_level(str(tmp_path / "level.avlb"), {}, obstacles)
+    level = BinaryLevel(str(tmp_path / "level.avlb"))
+    try:
+        assert isinstance(level.x_index, array)
+        assert list(level.x_index) == [ob["x_world"] for ob in obstacles]
+        assert level.bisect(1000) == 14
+        assert [n.key for n in level.to_tree(600, 800).iter_inorder()] == [
+            (ob["x_world"], ob["lane_idx"]) for ob in obstacles if 600 <= ob["x_world"] < 800]
+    finally:
+        level.close()
+
+
+def test_full_load_builds_keys_without_decoding_records(tmp_path, monkeypatch):
+    obstacles = [{"id": i, "x_world": 500 + 10 * (i // 4) + (0.5 if i == 9 else 0),
+                  "lane_idx": i % 4} for i in range(40)]
+    write_binary_level(str(tmp_path / "level.avlb"), {}, obstacles)
+
+    def no_records(self, i):
+        raise AssertionError("to_tree no debería decodificar registros")
+    monkeypatch.setattr(BinaryLevel, "obstacle", no_records)
+    _config, avl = load_game_from_binary(str(tmp_path / "level.avlb"))
+    assert [node.key for node in avl.iter_inorder()] == sorted(
+        (ob["x_world"], ob["lane_idx"]) for ob in obstacles)
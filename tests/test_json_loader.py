@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+import gui.levels
+from gui.json_loader import LevelStream, UnsortedLevelError
+from gui.levels import open_level
+
+
+def write_level(path, xs, declare_sorted):
+    data = {"config": {"game": {"distance_total": 100000}}}
+    if declare_sorted:
+        data["sorted"] = True
+    data["obstacles"] = [{"id": i + 1, "x_world": x, "lane_idx": i % 4, "width": 32, "height": 32}
+                         for i, x in enumerate(xs)]
+    path.write_text(json.dumps(data), encoding="utf-8")
+    return str(path)
+
+
+UNSORTED = [5000, 600, 90000, 1200, 30000, 700, 45000, 800]
+
+
+def test_stream_requires_sorted_declaration(tmp_path):
+    with pytest.raises(UnsortedLevelError):
+        LevelStream(write_level(tmp_path / "level.json", UNSORTED, declare_sorted=False))
+
+
+def test_large_unsorted_level_is_loaded_whole(tmp_path, monkeypatch):
+    monkeypatch.setattr(gui.levels, "STREAMING_MIN_BYTES", 0)
+    config, avl, stream = open_level(write_level(tmp_path / "level.json", UNSORTED, False))
+    assert stream is None
+    assert sorted(node.key[0] for node in avl.iter_inorder()) == sorted(UNSORTED)
+
+
+def test_stream_rejects_out_of_order_records(tmp_path):
+    stream = LevelStream(write_level(tmp_path / "level.json", UNSORTED, declare_sorted=True),
+                         lookahead=2000)
+    with pytest.raises(UnsortedLevelError):
+        for offset in range(0, 100000, 500):
+            stream.advance(offset)
+    assert stream.dropped == 0
+
+
+def test_stream_loads_every_sorted_obstacle(tmp_path, monkeypatch):
+    monkeypatch.setattr(gui.levels, "STREAMING_MIN_BYTES", 0)
+    xs = sorted(UNSORTED)
+    config, avl, stream = open_level(write_level(tmp_path / "level.json", xs, True))
+    assert stream is not None
+    for offset in range(0, 100000, 500):
+        stream.advance(offset)
+    assert stream.exhausted
+    assert stream.loaded == len(xs) and stream.dropped == 0
@@ -0,0 +1,94 @@
+import json
+import os
+
+from gui.level_cache import LevelCache
+from gui.persistent_avl import PersistentAVLTree
+
+
+def write_level(path, xs):
+    data = {"config": {"game": {"speed": 6}},
+            "obstacles": [{"id": i + 1, "x_world": x, "lane_idx": i % 4} for i, x in enumerate(xs)]}
+    path.write_text(json.dumps(data), encoding="utf-8")
+    return str(path)
+
+
+def keys(avl):
+    return [node.key for node in avl.iter_inorder()]
+
+
+def test_hits_share_nodes_and_stay_independent(tmp_path):
+    path = write_level(tmp_path / "level.json", [500, 900, 1500, 2000, 2600])
+    cache = LevelCache(cache_dir=str(tmp_path / "cache"))
+    config, first = cache.load(path)
+    _config, second = cache.load(path)
+    assert isinstance(second, PersistentAVLTree)
+    assert second.root is first.root
+    assert cache.stats["hits"] == 1 and cache.stats["misses"] == 1
+
+    # El juego elimina los obstáculos superados; la versión guardada no cambia
+    first.remove_passed_obstacles(1600)
+    config["game"]["speed"] = 99
+    config, third = cache.load(path)
+    assert keys(third) == keys(second) == [(500, 0), (900, 1), (1500, 2), (2000, 3), (2600, 0)]
+    assert config["game"]["speed"] == 6
+
+
+def test_changed_file_is_reloaded(tmp_path):
+    path = write_level(tmp_path / "level.json", [500, 900])
+    cache = LevelCache(cache_dir=str(tmp_path / "cache"))
+    cache.load(path)
+    write_level(tmp_path / "level.json", [700])
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    _config, avl = cache.load(path)
+    assert keys(avl) == [(700, 0)]
+    assert cache.stats["misses"] == 2
+
+
+def fail_to_parse(path):
+    raise AssertionError(f"no debería parsear {path}")
+
+
+def test_new_instance_loads_from_disk_without_parsing(tmp_path):
+    path = write_level(tmp_path / "level.json", [500, 900, 1500.5])
+    cache_dir = str(tmp_path / "cache")
+    config, avl = LevelCache(cache_dir=cache_dir).load(path)
+
+    cache = LevelCache(cache_dir=cache_dir, loader=fail_to_parse)
+    cold_config, cold = cache.load(path)
+    assert cache.stats["disk_hits"] == 1 and cache.stats["misses"] == 0
+    assert cold_config == config
+    assert ([(n.key, dict(n.obstacle)) for n in cold.iter_inorder()]
+            == [(n.key, dict(n.obstacle)) for n in avl.iter_inorder()])
+
+
+def test_unreadable_disk_entry_is_a_miss(tmp_path):
+    path = write_level(tmp_path / "level.json", [500, 900])
+    cache_dir = tmp_path / "cache"
+    LevelCache(cache_dir=str(cache_dir)).load(path)
+    (entry,) = cache_dir.iterdir()
+    entry.write_bytes(entry.read_bytes()[:40])
+
+    cache = LevelCache(cache_dir=str(cache_dir))
+    _config, avl = cache.load(path)
+    assert cache.stats["misses"] == 1
+    assert keys(avl) == [(500, 0), (900, 1)]
+
+
+def test_levels_with_fields_avlb_cannot_keep_stay_in_memory(tmp_path):
+    path = tmp_path / "level.json"
+    path.write_text(json.dumps({"obstacles": [{"x_world": 500, "lane_idx": 1, "speed": 3}]}),
+                    encoding="utf-8")
+    cache_dir = tmp_path / "cache"
+    _config, avl = LevelCache(cache_dir=str(cache_dir)).load(str(path))
+    assert [dict(n.obstacle) for n in avl.iter_inorder()] == [{"x_world": 500, "lane_idx": 1,
+                                                                "speed": 3}]
+    assert not cache_dir.exists() or not list(cache_dir.iterdir())
+
+
+def test_disk_is_capped_in_bytes(tmp_path):
+    cache = LevelCache(cache_dir=str(tmp_path / "cache"), max_disk_bytes=1)
+    for i in range(3):
+        cache.load(write_level(tmp_path / f"level{i}.json", [500 + i]))
+    assert len(list((tmp_path / "cache").iterdir())) == 1
+    assert cache.stats["disk_evictions"] == 2
@@ -0,0 +1,23 @@
+import pytest
+
+from gui.level_generator import generate_level
+
+
+def test_skewed_lanes_fail_fast_when_one_lane_would_overflow(tmp_path):
+    # 1500 obstáculos cada 1000 px caben en 4 carriles, pero no con casi todos en el carril 0
+    with pytest.raises(ValueError, match="carril 0"):
+        generate_level(str(tmp_path / "level.json"), 1000, density=1500, lane_weights=(10, 1, 1, 1),
+                       workers=1)
+    assert not (tmp_path / "level.json").exists()
+
+
+@pytest.mark.parametrize("ext", ["avlb", "json"])
+def test_output_does_not_depend_on_worker_count(tmp_path, ext):
+    outputs = []
+    for workers in (1, 3):
+        path = tmp_path / f"level{workers}.{ext}"
+        shards = generate_level(str(path), 2000, density=30, lane_weights=(1, 2, 2, 1),
+                                difficulty=0.7, seed=11, workers=workers, shard_size=300)
+        assert shards == 7
+        outputs.append(path.read_bytes())
+    assert outputs[0] == outputs[1]
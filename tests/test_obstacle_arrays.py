@@ -0,0 +1,89 @@
+import random
+
+import pytest
+
+from gui.avl_tree import AVLTree
+from gui.simulation import GameSimulation
+from gui.spatial_index import LaneIndex
+
+np = pytest.importorskip("numpy")
+from gui.obstacle_arrays import ObstacleArrays  # noqa: E402
+
+LANE_Y = [120, 200, 280, 360]
+
+
+def test_matches_lane_index_with_fractional_positions():
+    rnd = random.Random(5)
+    arrays, lanes = ObstacleArrays(LANE_Y, capacity=4), LaneIndex(LANE_Y)
+    obstacles = []
+    for _ in range(300):
+        ob = {"x_world": rnd.uniform(0, 3000), "lane_idx": rnd.randrange(4),
+              "width": rnd.randint(10, 40), "height": rnd.randint(10, 40)}
+        obstacles.append(ob)
+        arrays.add(ob)
+        lanes.add(ob)
+    for ob in obstacles[::7]:
+        arrays.discard(ob)
+        lanes.discard(ob)
+    remaining = [ob for i, ob in enumerate(obstacles) if i % 7]
+
+    for _ in range(200):
+        x = rnd.uniform(-50, 3000) + rnd.choice((0, 0.5, 0.25))
+        rect = (x, rnd.choice(LANE_Y) - 40, 100, 40)
+        exact = [ob for ob in lanes.query(*rect)
+                 if not (rect[0] + rect[2] < ob["x_world"] or rect[0] > ob["x_world"] + ob["width"]
+                         or rect[1] + rect[3] < LANE_Y[ob["lane_idx"]] - ob["height"]
+                         or rect[1] > LANE_Y[ob["lane_idx"]])]
+        assert [id(ob) for ob in arrays.query(*rect)] == [id(ob) for ob in exact]
+
+        ahead = {id(ob) for ob in arrays.ahead(x)}
+        assert ahead == {id(ob) for ob in remaining if ob["x_world"] + ob["width"] > x}
+
+
+def test_fractional_edge_is_not_truncated():
+    arrays = ObstacleArrays(LANE_Y)
+    ob = {"x_world": 100.75, "lane_idx": 1, "width": 32, "height": 32}
+    arrays.add(ob)
+    # Borde derecho en 132.75: truncar x a 100 lo dejaría atrás
+    assert arrays.ahead(132.5) == [ob]
+    assert arrays.query(132.6, 170, 10, 30) == [ob]
+    assert arrays.query(0, 170, 100.5, 30) == []
+
+
+def test_collide_keeps_the_hit_mask():
+    arrays = ObstacleArrays(LANE_Y, capacity=1)
+    old = {"x_world": 100, "lane_idx": 1, "width": 32, "height": 32, "hit": True}
+    new = {"x_world": 110, "lane_idx": 1, "width": 32, "height": 32}
+    other = {"x_world": 120, "lane_idx": 2, "width": 32, "height": 32}
+    for ob in (old, new, other):
+        arrays.add(ob)
+    car = (105, 170, 20, 20)
+    assert arrays.collide(*car) == [(old, False), (new, True)]
+    assert arrays.collide(*car) == [(old, False), (new, False)]
+    # Al quitar uno, el último pasa a su lugar junto con su estado
+    arrays.discard(old)
+    assert arrays.collide(120, 250, 5, 5) == [(other, True)]
+    assert arrays.collide(*car) == [(new, False)]
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_vectorized_game_matches_lane_index(seed):
+    results = []
+    for vectorized in (False, True):
+        obstacles = [{"id": i, "x_world": 400 + 37 * i, "lane_idx": (i * 7) % 4,
+                      "width": 32, "height": 32} for i in range(400)]
+        tree = AVLTree.from_sorted([((ob["x_world"], ob["lane_idx"]), ob) for ob in obstacles])
+        sim = GameSimulation(tree, {"game": {"distance_total": 100000}}, seed=seed)
+        assert sim.use_vectorized(vectorized) == vectorized
+        hits, lives = [], []
+        sim.on_hit = lambda ob: hits.append(ob["id"])
+        rnd = random.Random(seed)
+        sim.step(["start"])
+        for _ in range(2500):
+            sim.step([rnd.choice(("up", "down", "jump"))] if rnd.random() < 0.05 else [])
+            lives.append(sim.lives)
+            # Sin fin de partida, para seguir comparando
+            sim.lives = 1.0
+        results.append((hits, lives, sim.state_digest()))
+    assert results[0] == results[1]
+    assert results[0][0]
@@ -0,0 +1,24 @@
+from gui.avl_tree import AVLTree
+from gui.perf import PerfMonitor
+from gui.simulation import GameSimulation
+
+
+def test_counters_only_track_the_level_tree():
+    obstacles = [{"id": i + 1, "x_world": 300 + 150 * i, "lane_idx": i % 4} for i in range(40)]
+    tree = AVLTree.from_sorted([((ob["x_world"], ob["lane_idx"]), ob) for ob in obstacles])
+    sim = GameSimulation(tree, {"game": {"distance_total": 100000}}, seed=1)
+    sim.running = True
+    perf = PerfMonitor()
+    sim.perf = perf
+    perf.enable(tree)
+    for _ in range(300):
+        sim.step()
+
+    # LaneIndex usa un AVLTree por carril: sus inserciones no deben aparecer
+    assert perf.counters["inserts"] == 0
+    assert perf.counters["deletes"] == 0
+    assert perf.counters["evictions"] == 40 - tree.get_size(tree.root) > 0
+    assert AVLTree.counters is None
+
+    perf.disable()
+    assert tree.counters is None
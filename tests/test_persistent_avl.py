@@ -0,0 +1,75 @@
+import bisect
+import random
+
+import pytest
+
+from gui.avl_tree import AVLTree
+from gui.persistent_avl import PersistentAVLTree
+from tests.test_avl_tree import check_invariants, random_key
+
+
+def shape(tree):
+    """Forma completa del árbol (claves, alturas, tamaños y nodos), para detectar mutaciones."""
+    return [(id(node), node.key, node.height, node.size, id(node.left), id(node.right))
+            for node in tree.iter_preorder()]
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_snapshots_never_change_after_later_mutations(seed):
+    rnd = random.Random(seed)
+    reference = sorted({random_key(rnd) for _ in range(300)})
+    tree = PersistentAVLTree.from_tree(AVLTree.from_sorted([(key, None) for key in reference]))
+    saved = []
+    for step in range(1200):
+        op = rnd.random()
+        key = random_key(rnd)
+        i = bisect.bisect_left(reference, key)
+        present = i < len(reference) and reference[i] == key
+        if op < 0.45:
+            tree.insert(key, None)
+            if not present:
+                reference.insert(i, key)
+        elif op < 0.9:
+            tree.delete(key)
+            if present:
+                del reference[i]
+        elif op < 0.95:
+            left, right = tree.split(key)
+            tree = PersistentAVLTree.join(left, right)
+        else:
+            threshold = rnd.randrange(0, 300)
+            tree.remove_passed_obstacles(threshold, margin=0)
+            del reference[:bisect.bisect_left(reference, (threshold,))]
+        if step % 50 == 0:
+            snapshot = tree.snapshot()
+            saved.append((snapshot, shape(snapshot), list(reference)))
+
+    check_invariants(tree, reference)
+    for snapshot, old_shape, old_reference in saved:
+        assert shape(snapshot) == old_shape
+        check_invariants(snapshot, old_reference)
+
+
+def test_restore_returns_to_a_snapshot():
+    tree = PersistentAVLTree.from_tree(AVLTree.from_sorted([((x, 0), x) for x in range(100)]))
+    snapshot = tree.snapshot()
+    version = tree.version
+    for x in range(0, 100, 3):
+        tree.delete((x, 0))
+    tree.remove_passed_obstacles(50, margin=0)
+    tree.insert((500, 1), "nuevo")
+
+    tree.restore(snapshot)
+    check_invariants(tree, [(x, 0) for x in range(100)])
+    assert tree.root is snapshot.root
+    # restore cuenta como un cambio más, para que las cachés de dibujo se invaliden
+    assert tree.version > version
+    tree.delete((10, 0))
+    assert snapshot.count_range(10, 11) == 1
+
+
+def test_from_tree_takes_ownership_of_the_nodes():
+    source = AVLTree.from_sorted([((x, 0), x) for x in range(10)])
+    root = source.root
+    tree = PersistentAVLTree.from_tree(source)
+    assert tree.root is root and source.root is None
@@ -0,0 +1,55 @@
+import os
+import random
+
+from gui.levels import open_level
+from gui.replay import InputRecorder, Recording, replay_headless
+from gui.simulation import (ACTION_ADD_OBSTACLE, ACTION_DOWN, ACTION_JUMP, ACTION_REWIND,
+                            ACTION_START, ACTION_UP, ACTION_VIEW_WIDTH, GameSimulation)
+
+LEVEL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "level1.json")
+
+
+def record_game(path, seed, frames=1500):
+    config, avl, stream = open_level(LEVEL)
+    sim = GameSimulation(avl, config, seed=seed)
+    sim.level_stream = stream
+    sim.recorder = InputRecorder(path, LEVEL, seed)
+    rnd = random.Random(seed)
+    sim.step([ACTION_START, (ACTION_VIEW_WIDTH, 1500)])
+    for _ in range(frames):
+        r = rnd.random()
+        if r < 0.05:
+            inputs = [rnd.choice((ACTION_UP, ACTION_DOWN, ACTION_JUMP))]
+        elif r < 0.07:
+            inputs = [ACTION_ADD_OBSTACLE]
+        elif r < 0.075:
+            inputs = [ACTION_REWIND]
+        else:
+            inputs = []
+        if sim.step(inputs) is not None:
+            break
+    sim.recorder.close(sim)
+    if stream:
+        stream.close()
+    return sim
+
+
+def test_recording_replays_to_the_same_state(tmp_path):
+    path = str(tmp_path / "partida.avlr")
+    played = record_game(path, seed=7)
+
+    recording = Recording(path)
+    assert recording.check_level()
+    assert recording.end_frame == played.frame
+    replayed, timings = replay_headless(recording)
+    assert len(timings) == played.frame
+    assert replayed.state_digest() == recording.final_digest == played.state_digest()
+
+
+def test_replay_with_another_seed_does_not_match(tmp_path):
+    path = str(tmp_path / "partida.avlr")
+    record_game(path, seed=3, frames=600)
+    recording = Recording(path)
+    recording.seed += 1
+    replayed, _timings = replay_headless(recording)
+    assert replayed.state_digest() != recording.final_digest
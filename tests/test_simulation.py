@@ -0,0 +1,26 @@
+from gui.avl_tree import AVLTree
+from gui.simulation import GameSimulation
+
+
+def make_sim(obstacles, seed=1):
+    tree = AVLTree.from_sorted(sorted(((ob["x_world"], ob["lane_idx"]), ob) for ob in obstacles))
+    sim = GameSimulation(tree, {"game": {"distance_total": 100000}}, seed=seed)
+    sim.running = True
+    return sim
+
+
+def test_level_obstacle_sharing_id_with_hot_add_still_activates():
+    sim = make_sim([{"id": 1, "x_world": 600, "lane_idx": 0, "width": 32, "height": 32}])
+    hot = sim.add_random_obstacle()
+    # Obstáculo del nivel con el mismo id que el agregado en caliente, dentro de la ventana
+    level_key = (700, 2)
+    sim.avl_tree.insert(level_key, {"id": hot["id"], "x_world": 700, "lane_idx": 2,
+                                    "width": 32, "height": 32})
+    sim.step()
+
+    assert level_key in sim._active
+    assert sim._active[level_key]["id"] == hot["id"]
+    # El agregado en caliente entra una sola vez, por spawns y no por el árbol
+    shared = [ob for ob in sim.obstacles if ob["id"] == hot["id"]]
+    assert len(shared) == 2
+    assert any(ob is hot for ob in shared)
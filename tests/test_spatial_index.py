@@ -0,0 +1,38 @@
+import random
+
+from gui.simulation import GameSimulation
+from gui.spatial_index import LaneIndex
+
+LANE_Y = [120, 200, 280, 360]
+
+
+def touching(obstacles, rect):
+    """Recorrido completo: los obstáculos cuyo rectángulo toca rect (prueba del juego)."""
+    return {id(ob) for ob in obstacles
+            if GameSimulation.check_collision(rect, (ob["x_world"], LANE_Y[ob["lane_idx"]] - ob["height"],
+                                                     ob["width"], ob["height"]))}
+
+
+def test_query_finds_every_obstacle_a_full_scan_finds():
+    rnd = random.Random(8)
+    index, live = LaneIndex(LANE_Y), {}
+    for step in range(3000):
+        if live and rnd.random() < 0.3:
+            ob = live.pop(rnd.choice(list(live)))
+            index.discard(ob)
+        else:
+            # Posiciones repetidas a propósito: la clave lleva una secuencia para distinguirlas
+            ob = {"x_world": rnd.randrange(0, 5000, 10), "lane_idx": rnd.randrange(4),
+                  "width": rnd.randint(8, 120), "height": rnd.randint(8, 90)}
+            live[id(ob)] = ob
+            index.add(ob)
+        if step % 10:
+            continue
+        assert len(index) == len(live)
+        for _ in range(5):
+            # Coordenadas enteras: los bordes coinciden a menudo y la prueba es inclusiva
+            rect = (rnd.randrange(-150, 5000), rnd.randrange(0, 400), rnd.randint(1, 80),
+                    rnd.randint(1, 80))
+            found = {id(ob) for ob in index.query(*rect)}
+            # Superconjunto de lo que toca el rectángulo y solo con obstáculos vivos
+            assert touching(live.values(), rect) <= found <= live.keys()
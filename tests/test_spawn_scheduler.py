@@ -0,0 +1,35 @@
+import random
+
+import pytest
+
+from gui.spawn_scheduler import SpawnScheduler
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_matches_the_per_tick_scan(seed):
+    rnd = random.Random(seed)
+    scheduler, registered = SpawnScheduler(), []
+    x_lo, width = 0, 800
+    previous = []
+    for _ in range(2000):
+        if rnd.random() < 0.1:
+            # Algunos detrás de la ventana (nunca se ven) y posiciones repetidas
+            ob = {"x_world": x_lo + rnd.randrange(-100, 3000, 50)}
+            registered.append(ob)
+            scheduler.add(ob)
+        x_lo += rnd.randrange(0, 12)
+        if rnd.random() < 0.01:
+            # Cambio de ancho de la vista: la ventana puede achicarse
+            width = rnd.randrange(400, 1600)
+        x_hi = x_lo + width + 500
+        activated, retired = scheduler.advance(x_lo, x_hi)
+
+        # Lo que hacía GameSimulation.step antes: recorrer todo lo registrado en cada tick
+        visible = [ob for ob in registered if x_lo <= ob["x_world"] < x_hi]
+        assert [id(ob) for ob in scheduler.active.values()] == [id(ob) for ob in visible]
+        before = {id(ob) for ob in previous}
+        assert [id(ob) for ob in activated] == [id(ob) for ob in visible if id(ob) not in before]
+        assert {id(ob) for ob in retired} == before - {id(ob) for ob in visible}
+        assert [id(ob) for ob in scheduler] == [id(ob) for ob in registered
+                                                if ob["x_world"] >= x_lo]
+        previous = visible